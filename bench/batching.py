@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Compares the old one-query-per-lookup identity resolution with the batched
+# resolver in service/identity.py. Both run against the fake PostgREST server
+# with cold identity caches, so every lookup has to reach the database.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+USERS = 500
+OSHI_PER_USER = 2
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def per_call(supabase, email, oshi_name):
+    response = await supabase.table('users').select('id').eq('email', email).execute()
+    user_id = response.data[0]['id']
+    response = await supabase.table('oshi').select('id').eq('user_id', user_id).eq('oshi_name', oshi_name).execute()
+    return response.data[0]['id']
+
+async def batched(supabase, email, oshi_name):
+    from service import identity
+    _, oshi_id = await identity.resolve_oshi(email, oshi_name)
+    return oshi_id
+
+async def measure(postgrest, lookup, concurrency):
+    from service import identity
+    from service.clients import get_supabase
+    identity.user_ids.clear()
+    identity.oshi_ids.clear()
+    supabase = await get_supabase()
+    await postgrest.post("/_stats/reset")
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        lookup(supabase, f"user{i % USERS}@bench.test", f"oshi{i % OSHI_PER_USER}") for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    round_trips = sum((await postgrest.get("/_stats")).json()["requests"].values())
+    return elapsed, round_trips
+
+async def main(args):
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": ROOT, "FAKE_POSTGREST_LATENCY_MS": str(args.db_latency)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench.fake_postgrest:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as postgrest:
+            for _ in range(300):
+                try:
+                    await postgrest.get("/_stats")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.05)
+            users = [{"email": f"user{i}@bench.test"} for i in range(USERS)]
+            users = (await postgrest.post("/rest/v1/users", json=users)).json()
+            oshi = [{"user_id": user["id"], "oshi_name": f"oshi{n}"} for user in users for n in range(OSHI_PER_USER)]
+            await postgrest.post("/rest/v1/oshi", json=oshi, headers={"Prefer": "return=minimal"})
+
+            print(f"{'concurrency':>12}{'per-call ms':>14}{'trips':>8}{'batched ms':>14}{'trips':>8}")
+            for concurrency in args.concurrency:
+                plain_time, plain_trips = await measure(postgrest, per_call, concurrency)
+                batch_time, batch_trips = await measure(postgrest, batched, concurrency)
+                print(f"{concurrency:>12}{plain_time * 1000:>14.1f}{plain_trips:>8}{batch_time * 1000:>14.1f}{batch_trips:>8}")
+    finally:
+        from service.clients import close_clients
+        await close_clients()
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call vs. batched identity lookups against the fake PostgREST server.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--db-latency", type=float, default=2.0, help="injected PostgREST latency in ms")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import(env):
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_response(env, path, timeout=30):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise TimeoutError(f"no response from {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def slowest_imports(env, count):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+def summarize(label, samples):
+    samples_ms = [sample * 1000 for sample in samples]
+    print(f"{label:<24} median {statistics.median(samples_ms):8.1f} ms   min {min(samples_ms):8.1f} ms   max {max(samples_ms):8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-response of the FastAPI app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/send")
+    parser.add_argument("--warm-up", action="store_true", help="run the startup warm-up (needs reachable upstreams)")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    args = parser.parse_args()
+
+    env = {**os.environ, "WARM_UP_ON_STARTUP": "1" if args.warm_up else "0"}
+    summarize("import main", [measure_import(env) for _ in range(args.runs)])
+    summarize(f"first response {args.path}", [measure_first_response(env, args.path) for _ in range(args.runs)])
+    print("\nslowest imports (cumulative):")
+    for cumulative, name in slowest_imports(env, args.top):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
@@ -0,0 +1,52 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from service import clients
+
+SEARCH_RESPONSE = {"query": {"search": [{"title": "星野源"}, {"title": "星野源のオールナイトニッポン"}]}}
+
+def make_upstream(latency):
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=SEARCH_RESPONSE)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+async def run(requests, latency):
+    clients._http_client = make_upstream(latency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(query):
+            # Distinct queries, so neither the autocomplete index nor single-flight answers them.
+            response = await client.post("/oshi/search-oshi", json={"query": query})
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        for i in range(requests):
+            await one(f"sequential {i}")
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(f"concurrent {i}") for i in range(requests)))
+        concurrent = time.perf_counter() - started
+
+    await clients.close_clients()
+    print(f"upstream latency     {latency * 1000:.0f} ms")
+    print(f"requests             {requests}")
+    print(f"sequential           {sequential:.3f} s  ({requests / sequential:.1f} req/s)")
+    print(f"concurrent           {concurrent:.3f} s  ({requests / concurrent:.1f} req/s)")
+    print(f"speedup              {sequential / concurrent:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show that slow upstream calls overlap on a single event loop.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated Wikipedia latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
@@ -0,0 +1,269 @@
+import asyncio
+import itertools
+import json
+import os
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# In-memory stand-in for the Supabase REST endpoint. It implements the slice of
+# PostgREST the handlers use: select, eq/neq/gt/gte/lt/lte/in/is filters and
+# or/and trees of them, order, limit/offset, insert, upsert, update and delete,
+# with the tables' unique keys enforced, and the rpc functions of migrations/.
+
+LATENCY = float(os.getenv("FAKE_POSTGREST_LATENCY_MS", "0")) / 1000
+
+TABLES = ("users", "genres", "user_genres", "oshi", "content", "text_data", "image_data", "event_data", "sns_data")
+GENERATED_IDS = {"oshi": "int", "content": "int", "users": "uuid"}
+# Primary keys and unique constraints, as in migrations/. Upserts may only name one
+# of these as on_conflict, and plain inserts that collide with one fail.
+UNIQUE_KEYS = {
+    "users": [("id",)],
+    "oshi": [("id",), ("user_id", "oshi_name")],
+    "content": [("id",)],
+    "text_data": [("id",)],
+    "image_data": [("id",)],
+    "event_data": [("id",)],
+}
+SEED_GENRES = ("アイドル", "アーティスト", "俳優", "声優", "アニメ", "漫画", "スポーツ", "YouTuber", "VTuber", "お笑い")
+
+counter = itertools.count(1)
+tables = {table: [] for table in TABLES}
+tables["genres"] = [{"genre_name": genre} for genre in SEED_GENRES]
+request_counts = {table: 0 for table in TABLES}
+
+def split_values(raw):
+    values, current, quoted = [], "", False
+    for char in raw:
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            values.append(current)
+            current = ""
+        else:
+            current += char
+    values.append(current)
+    return values
+
+def split_conditions(raw):
+    # Top-level commas of an or/and tree; nested groups and quoted values stay whole.
+    parts, current, depth, quoted, escaped = [], "", 0, False, False
+    for char in raw:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+def logical(operator, raw):
+    tests = [condition(part) for part in split_conditions(raw.strip()[1:-1])]
+    combine = any if operator == "or" else all
+    return lambda row: combine(test(row) for test in tests)
+
+def condition(expression):
+    for operator in ("or", "and"):
+        if expression.startswith(operator + "("):
+            return logical(operator, expression[len(operator):])
+    column, _, rest = expression.partition(".")
+    op, _, value = rest.partition(".")
+    return predicate(column, f"{op}.{unquote(value)}" if op != "in" else rest)
+
+def coerce(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def compare(left, op, right):
+    if left is None:
+        return False
+    left, right = coerce(left), coerce(right)
+    if type(left) is not type(right):
+        left, right = str(left), str(right)
+    return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+
+def predicate(column, expression):
+    op, _, value = expression.partition(".")
+    negate = op == "not"
+    if negate:
+        op, _, value = value.partition(".")
+    if op == "eq":
+        test = lambda field: field is not None and str(field) == value
+    elif op == "neq":
+        test = lambda field: field is None or str(field) != value
+    elif op == "in":
+        values = set(split_values(value.strip("()")))
+        test = lambda field: field is not None and str(field) in values
+    elif op == "is":
+        test = lambda field: field is None if value == "null" else str(field).lower() == value
+    elif op in ("gt", "gte", "lt", "lte"):
+        test = lambda field: compare(field, op, value)
+    else:
+        raise ValueError(f"unsupported operator {op}")
+    if negate:
+        return lambda row: not test(row.get(column))
+    return lambda row: test(row.get(column))
+
+def filtered(table, params):
+    rows = tables[table]
+    for column, expression in params.multi_items():
+        if column in ("select", "order", "limit", "offset", "columns", "on_conflict"):
+            continue
+        test = logical(column, expression) if column in ("or", "and") else predicate(column, expression)
+        rows = list(filter(test, rows))
+    return rows
+
+def project(rows, select):
+    if not select or select == "*":
+        return [dict(row) for row in rows]
+    columns = [column.strip() for column in select.split(",")]
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+def ordered(rows, order):
+    for part in reversed(order.split(",")):
+        column, *modifiers = part.split(".")
+        rows = sorted(
+            rows,
+            key=lambda row: ((row.get(column) is None) != ("nullsfirst" in modifiers), coerce(row.get(column))),
+            reverse="desc" in modifiers,
+        )
+    return rows
+
+def new_row(table, payload):
+    row = dict(payload)
+    kind = GENERATED_IDS.get(table)
+    if kind and row.get("id") is None:
+        row["id"] = next(counter) if kind == "int" else str(uuid.uuid4())
+    return row
+
+def representation(request, rows):
+    if "return=minimal" in request.headers.get("prefer", ""):
+        return Response(status_code=201)
+    return JSONResponse(rows, status_code=201)
+
+async def handle(request: Request):
+    table = request.path_params["table"]
+    if table not in tables:
+        return JSONResponse({"message": f"relation {table} does not exist"}, status_code=404)
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    request_counts[table] += 1
+    params = request.query_params
+
+    if request.method == "GET":
+        rows = filtered(table, params)
+        if "order" in params:
+            rows = ordered(rows, params["order"])
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+        return JSONResponse(project(rows, params.get("select")))
+
+    if request.method == "POST":
+        payload = json.loads(await request.body() or b"[]")
+        payload = payload if isinstance(payload, list) else [payload]
+        prefer = request.headers.get("prefer", "")
+        conflict_columns = tuple(column for column in params.get("on_conflict", "").split(",") if column)
+        if not conflict_columns and "resolution=" in prefer:
+            conflict_columns = ("id",)
+        keys = UNIQUE_KEYS.get(table, [])
+        if conflict_columns and conflict_columns not in keys:
+            return JSONResponse(
+                {"code": "42P10", "message": "there is no unique or exclusion constraint matching the ON CONFLICT specification"},
+                status_code=400,
+            )
+        # One pass over the table per request builds every key lookup the payload needs.
+        indexes = {key: {tuple(row.get(c) for c in key): row for row in tables[table]} for key in keys}
+        written = []
+        for item in payload:
+            existing = None
+            if conflict_columns:
+                existing = indexes[conflict_columns].get(tuple(item.get(c) for c in conflict_columns))
+            if existing is not None:
+                # ignore-duplicates is ON CONFLICT DO NOTHING: the skipped row is not returned.
+                if "resolution=merge-duplicates" in prefer:
+                    existing.update(item)
+                    written.append(dict(existing))
+                continue
+            row = new_row(table, item)
+            if any(tuple(row.get(c) for c in key) in index for key, index in indexes.items()):
+                return JSONResponse({"code": "23505", "message": f"duplicate key value violates unique constraint on {table}"}, status_code=409)
+            for key, index in indexes.items():
+                index[tuple(row.get(c) for c in key)] = row
+            tables[table].append(row)
+            written.append(dict(row))
+        return representation(request, written)
+
+    if request.method == "PATCH":
+        payload = json.loads(await request.body())
+        rows = filtered(table, params)
+        for row in rows:
+            row.update(payload)
+        return JSONResponse([dict(row) for row in rows])
+
+    if request.method == "DELETE":
+        rows = filtered(table, params)
+        doomed = {id(row) for row in rows}
+        tables[table] = [row for row in tables[table] if id(row) not in doomed]
+        return JSONResponse([dict(row) for row in rows])
+
+    return Response(status_code=405)
+
+def dashboard_blocks(oshi_ids, per_oshi):
+    wanted = {str(oshi_id) for oshi_id in oshi_ids}
+    rows = ordered([row for row in tables["content"] if str(row.get("oshi_id")) in wanted], "oshi_id,order_index,id")
+    positions = {}
+    kept = []
+    for row in rows:
+        positions[str(row["oshi_id"])] = positions.get(str(row["oshi_id"]), 0) + 1
+        if positions[str(row["oshi_id"])] <= per_oshi:
+            kept.append(row)
+    return kept
+
+# Python versions of the SQL functions in migrations/, called through /rpc/.
+FUNCTIONS = {"dashboard_blocks": dashboard_blocks}
+
+async def call(request: Request):
+    name = request.path_params["function"]
+    if name not in FUNCTIONS:
+        return JSONResponse({"code": "PGRST202", "message": f"function {name} does not exist"}, status_code=404)
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    request_counts[f"rpc/{name}"] = request_counts.get(f"rpc/{name}", 0) + 1
+    rows = FUNCTIONS[name](**json.loads(await request.body() or b"{}"))
+    return JSONResponse(project(rows, request.query_params.get("select")))
+
+async def stats(request: Request):
+    return JSONResponse({"requests": request_counts, "rows": {table: len(rows) for table, rows in tables.items()}})
+
+async def reset_stats(request: Request):
+    for table in request_counts:
+        request_counts[table] = 0
+    return JSONResponse({"requests": request_counts})
+
+app = Starlette(routes=[
+    Route("/_stats", stats, methods=["GET"]),
+    Route("/_stats/reset", reset_stats, methods=["POST"]),
+    Route("/rest/v1/rpc/{function}", call, methods=["POST"]),
+    Route("/rest/v1/{table}", handle, methods=["GET", "POST", "PATCH", "DELETE"]),
+])
@@ -0,0 +1,102 @@
+import asyncio
+import glob
+import io
+import os
+import zlib
+from urllib.parse import quote
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from PIL import Image
+
+# Serves the saved articles in bench/fixtures/wikipedia through the subset of
+# the ja.wikipedia.org API that handler/oshi.py calls. Every title resolves to
+# one of the fixtures, chosen by a stable hash of the title. /images/* stands in
+# for upload.wikimedia.org and serves a generated picture per file name.
+
+LATENCY = float(os.getenv("FAKE_WIKIPEDIA_LATENCY_MS", "0")) / 1000
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wikipedia")
+SEARCH_TITLES = ("星空ひかり", "星空ひかりのオールナイトニッポン", "ミルキーウェイ (アイドルグループ)", "朝霧レン", "星の剣")
+
+fixtures = []
+for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+    with open(path, encoding="utf-8") as f:
+        fixtures.append(f.read())
+
+request_counts = {"info": 0, "search": 0, "parse": 0, "image": 0}
+# Set through POST /_faults to simulate an upstream incident.
+faults = {"status": None, "delay_ms": 0}
+
+def page_id(title):
+    return zlib.crc32(title.encode()) % 10_000_000 + 1
+
+def article_html(title):
+    return fixtures[page_id(title) % len(fixtures)]
+
+def page_url(request, title):
+    return f"{request.base_url}wiki/{quote(title.replace(' ', '_'))}"
+
+async def api(request: Request):
+    if request.method == "HEAD":
+        return Response()
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if faults["delay_ms"]:
+        await asyncio.sleep(faults["delay_ms"] / 1000)
+    if faults["status"]:
+        return JSONResponse({"error": {"code": "fault"}}, status_code=faults["status"])
+    params = request.query_params
+    action = params.get("action")
+
+    if action == "query" and params.get("list") == "search":
+        request_counts["search"] += 1
+        query = params.get("srsearch", "")
+        limit = int(params.get("srlimit", 10))
+        titles = [title for title in SEARCH_TITLES if query and query in title] or [f"{query} (曖昧さ回避)"]
+        return JSONResponse({"query": {"search": [{"title": title} for title in titles[:limit]]}})
+
+    if action == "query":
+        request_counts["info"] += 1
+        pages = {}
+        for title in params.get("titles", "").split("|"):
+            pages[str(page_id(title))] = {
+                "pageid": page_id(title),
+                "title": title,
+                "fullurl": page_url(request, title),
+                "lastrevid": page_id(title) * 7,
+            }
+        return JSONResponse({"query": {"pages": pages}})
+
+    if action == "parse":
+        request_counts["parse"] += 1
+        title = params.get("page", "")
+        return JSONResponse({
+            "parse": {"title": title, "pageid": page_id(title), "revid": page_id(title) * 7, "text": article_html(title)}
+        })
+
+    return JSONResponse({"error": {"code": "badvalue", "info": f"Unrecognized action {action}"}})
+
+async def image(request: Request):
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    request_counts["image"] += 1
+    seed = zlib.crc32(request.path_params["name"].encode())
+    output = io.BytesIO()
+    Image.new("RGB", (1200, 800), (seed % 256, seed // 256 % 256, seed // 65536 % 256)).save(output, format="PNG")
+    return Response(output.getvalue(), media_type="image/png")
+
+async def stats(request: Request):
+    return JSONResponse({"requests": request_counts})
+
+async def set_faults(request: Request):
+    faults.update(await request.json())
+    return JSONResponse(faults)
+
+app = Starlette(routes=[
+    Route("/_stats", stats, methods=["GET"]),
+    Route("/_faults", set_faults, methods=["POST"]),
+    Route("/w/api.php", api, methods=["GET", "HEAD"]),
+    Route("/images/{name}", image, methods=["GET"]),
+])
@@ -0,0 +1,69 @@
+from bs4 import BeautifulSoup
+
+# Reference BeautifulSoup parser that handler/oshi.py used before the
+# streaming extractor; kept so bench/wiki_extract.py can check parity.
+
+def parse_wikipedia_html(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    nationality = "Nationality not found"
+    infobox = soup.find("table", class_="infobox")
+    if infobox:
+        nationality_tag = infobox.find("th", text="国籍")
+        if nationality_tag:
+            nationality_data = nationality_tag.find_next_sibling("td")
+            if nationality_data:
+                nationality = nationality_data.get_text(strip=True)
+    official_site_tag = soup.find(class_="official-website")
+    official_site_url = official_site_tag.a['href'] if official_site_tag and official_site_tag.a else "Official site not found"
+    sns_links = extract_sns_links(soup)
+    image_url = None
+    if infobox:
+        image_tag = infobox.find("img")
+        if image_tag:
+            image_url = f"https:{image_tag['src']}"
+            if "Flag_of" in image_url:
+                image_url = "https://www.shoshinsha-design.com/wp-content/uploads/2020/05/%E3%83%8E%E3%83%BC%E3%82%A4%E3%83%A1%E3%83%BC%E3%82%B7%E3%82%99-760x460.png"
+        else:
+            image_url = "Image not found"
+    profession = "Profession not found"
+    if infobox:
+        profession_tag = infobox.find("th", text="職業")
+        if profession_tag:
+            profession_data = profession_tag.find_next_sibling("td")
+            if profession_data:
+                professions = profession_data.get_text(strip=True).split('、')
+                profession = ', '.join(professions)
+    summary = "Summary not found"
+    content_div = soup.find("div", class_="mw-parser-output")
+    if content_div:
+        summary_tag = content_div.find("p")
+        summary = summary_tag.get_text(strip=True) if summary_tag else "Summary not found"
+    return {
+        "official_site_url": official_site_url,
+        "sns_links": sns_links,
+        "image_url": image_url,
+        "profession": profession,
+        "summary": summary,
+    }
+
+def extract_sns_links(soup):
+    sns_links = {"youtube": None, "spotify": None, "soundcloud": None, "x": None, "instagram": None, "applemusic": None, "facebook": None}
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if "references" in link.get('class', []):
+            continue
+        if "youtube.com" in href:
+            sns_links["youtube"] = href
+        elif "spotify.com" in href:
+            sns_links["spotify"] = href
+        elif "soundcloud.com" in href:
+            sns_links["soundcloud"] = href
+        elif "twitter.com" in href or "x.com" in href:
+            sns_links["x"] = href
+        elif "instagram.com" in href:
+            sns_links["instagram"] = href
+        elif "music.apple.com" in href:
+            sns_links["applemusic"] = href
+        elif "facebook.com" in href:
+            sns_links["facebook"] = href
+    return sns_links
@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import httpx
+
+# One-command offline load test: starts the fake PostgREST and Wikipedia
+# servers, runs the app against them under uvicorn, seeds data through the
+# API and reports latency percentiles, throughput and database round trips
+# per route. Each route gets a discarded warm-up run and is then measured
+# several times at a fixed concurrency; every metric is the median over those
+# runs, so one noisy run neither fails the comparison nor skews a saved baseline.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FAKE_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+USERS = 10
+OSHI_PER_USER = 3
+BLOCKS_PER_PAGE = 60
+GENRES = ["アイドル", "アーティスト", "声優"]
+IMAGES = 10
+THUMB_WIDTHS = (96, 240, 480, 960)
+
+def email(i):
+    return f"bench{i % USERS}@fancloud.test"
+
+def oshi_name(i):
+    return f"推し{i % OSHI_PER_USER}"
+
+def page_blocks(count, offset=0):
+    blocks = []
+    for index in range(offset, offset + count):
+        kind = index % 4
+        if kind == 0:
+            blocks.append({"type": "text", "text": f"メモ {index}", "fontSize": 16, "alignment": "left", "order_index": index})
+        elif kind == 1:
+            blocks.append({"type": "image", "src": f"https://img.example/{index}.png", "size": 200, "order_index": index})
+        elif kind == 2:
+            blocks.append({"type": "event", "title": f"ライブ {index}", "start_date": "2026-11-01", "end_date": "2026-11-02", "count": 1, "order_index": index})
+        else:
+            blocks.append({"type": "sns", "snsLinks": [{"name": "x", "url": "https://x.com/oshi"}], "order_index": index})
+    return blocks
+
+def image_src(context, i):
+    return f"{context['images']}/bench{i % IMAGES}.png"
+
+# (method, route, body, path): path builds the request URL for routes with
+# path or query parameters, from the values that seed() collects.
+SCENARIOS = [
+    ("GET", "/", lambda i: None),
+    ("GET", "/send", lambda i: None),
+    ("POST", "/user/register", lambda i: {"username": f"new{i}", "email": f"new{i}-{time.time_ns()}@fancloud.test", "password": "pw"}),
+    ("POST", "/user/login", lambda i: {"email": email(i), "password": "pw"}),
+    ("GET", "/genre/genres", lambda i: None),
+    ("POST", "/genre/select-genres", lambda i: {"email": email(i), "genres": GENRES[:1]}),
+    ("POST", "/genre/get-user-genres", lambda i: {"email": email(i)}),
+    ("POST", "/oshi/search-oshi", lambda i: {"query": "星空"}),
+    ("POST", "/oshi/fetch-oshi-info", lambda i: {"oshi_name": oshi_name(i)}),
+    ("POST", "/oshi/save-oshi-info-and-genres", lambda i: {"email": email(i), "oshi_name": oshi_name(i), "genre": GENRES[0]}),
+    ("POST", "/oshi/get-user-oshi-genres", lambda i: {"email": email(i)}),
+    ("POST", "/dashboard/home", lambda i: {"email": email(i), "blocks_per_oshi": 10}),
+    ("POST", "/content/fetch-content", lambda i: {"email": email(i), "oshi_name": oshi_name(i)}),
+    ("POST", "/content/search", lambda i: {"email": email(i), "query": f"ライブ {i % BLOCKS_PER_PAGE}"}),
+    ("POST", "/calendar/events", lambda i: {"email": email(i), "start": "2026-10-01", "end": "2026-12-31"}),
+    ("POST", "/calendar/feed-url", lambda i: {"email": email(i)}),
+    ("GET", "/calendar/feeds/{user_id}/{token}.ics", lambda i: None, lambda i, context: context["feeds"][i % USERS]),
+    ("GET", "/image/thumb", lambda i: None,
+     lambda i, context: f"/image/thumb?src={quote(image_src(context, i), safe='')}&w={THUMB_WIDTHS[i % len(THUMB_WIDTHS)]}"),
+    ("GET", "/image/v/{name}", lambda i: None, lambda i, context: context["variants"][i % IMAGES]),
+    ("POST", "/content/create-content", lambda i: {"email": email(i), "oshi_name": "追記用", "content": page_blocks(10, 1000 + i * 10)}),
+    ("POST", "/oshi/delete-oshi", lambda i: {"email": email(i), "oshi_names": [f"削除{i}-{n}" for n in range(5)]}),
+    # Last, because it adds thousands of oshi rows that would slow the scenarios after it.
+    ("POST", "/oshi/import-oshi", lambda i: {"email": email(i), "oshi": [{"oshi_name": f"一括{i}-{n}", "genre": GENRES[n % len(GENRES)]} for n in range(20)]}),
+]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start(module, port, env):
+    # uvicorn closes connections idle for 5 s by default, which races with the client
+    # reusing them between scenarios and fails requests with ReadError.
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning", "--timeout-keep-alive", "120"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+
+async def wait_until_up(url, timeout=30):
+    started = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                await client.get(url, timeout=1)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise TimeoutError(f"{url} did not come up")
+
+async def seed(client, postgrest, context):
+    await asyncio.gather(*(
+        client.post("/user/register", json={"username": f"bench{i}", "email": email(i), "password": "pw"})
+        for i in range(USERS)
+    ))
+    for i in range(USERS):
+        for n in range(OSHI_PER_USER):
+            (await client.post("/oshi/save-oshi-info-and-genres", json={"email": email(i), "oshi_name": oshi_name(n), "genre": GENRES[n % len(GENRES)]})).raise_for_status()
+        (await client.post("/oshi/save-oshi-info-and-genres", json={"email": email(i), "oshi_name": "追記用", "genre": GENRES[0]})).raise_for_status()
+    for i in range(USERS):
+        for n in range(OSHI_PER_USER):
+            (await client.post("/content/create-content", json={"email": email(i), "oshi_name": oshi_name(n), "content": page_blocks(BLOCKS_PER_PAGE)})).raise_for_status()
+
+    context["feeds"] = [(await client.post("/calendar/feed-url", json={"email": email(i)})).json()["path"] for i in range(USERS)]
+    context["variants"] = []
+    for i in range(IMAGES):
+        response = await client.get("/image/thumb", params={"src": image_src(context, i), "w": 240})
+        if response.status_code != 302:
+            raise RuntimeError(f"/image/thumb returned {response.status_code}")
+        context["variants"].append(response.headers["location"])
+
+async def settle(client, timeout=60):
+    # Saving an oshi queues background enrichment; measuring while the worker still
+    # fetches and parses pages would time that work instead of the route.
+    deadline = time.monotonic() + timeout
+    while (await client.get("/cache-stats")).json()["enrichment"]["queued"]:
+        if time.monotonic() > deadline:
+            raise TimeoutError("background enrichment did not finish")
+        await asyncio.sleep(0.1)
+
+async def seed_doomed(postgrest, first, count):
+    # Inserted right before each delete-oshi run, so routes measured earlier see
+    # users with their usual handful of oshi rather than every row waiting to be deleted.
+    users = (await postgrest.get("/rest/v1/users", params={"select": "id,email"})).json()
+    user_ids = {user["email"]: user["id"] for user in users}
+    doomed = [
+        {"user_id": user_ids[email(i)], "oshi_name": f"削除{i}-{n}", "genres": GENRES[0]}
+        for i in range(first, first + count) for n in range(5)
+    ]
+    (await postgrest.post("/rest/v1/oshi", json=doomed)).raise_for_status()
+
+SETUP = {"/oshi/delete-oshi": seed_doomed}
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+async def run_scenario(client, postgrest, method, path, payload, requests, concurrency, offset=0):
+    await postgrest.post("/_stats/reset")
+    latencies = []
+    errors = 0
+    # Repeated runs take fresh indexes so they don't re-delete or re-import the same oshi.
+    next_index = iter(range(offset, offset + requests))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            body = payload(i)
+            started = time.perf_counter()
+            response = await client.request(method, path(i), json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    db_requests = sum((await postgrest.get("/_stats")).json()["requests"].values())
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rps": round(requests / elapsed, 1),
+        "errors": errors,
+        "db_calls_per_request": round(db_requests / requests, 2),
+    }
+
+def median_run(runs):
+    # Each metric is its own median across runs; any error in any run counts.
+    middle = len(runs) // 2
+    return {
+        **{metric: sorted(run[metric] for run in runs)[middle] for metric in ("p50_ms", "p95_ms", "p99_ms", "rps", "db_calls_per_request")},
+        "errors": max(run["errors"] for run in runs),
+    }
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for route, current in results.items():
+        previous = baseline.get(route)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance) and current["p95_ms"] - previous["p95_ms"] > 2:
+            regressions.append(f"{route}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current["db_calls_per_request"] > previous["db_calls_per_request"] + 0.05:
+            regressions.append(f"{route}: db calls/request {previous['db_calls_per_request']} -> {current['db_calls_per_request']}")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{route}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+def route_name(scenario):
+    return f"{scenario[0]} {scenario[1]}"
+
+async def measure(client, postgrest, scenario, args, context):
+    method, route_path, payload, *path = scenario
+    url = (lambda i: path[0](i, context)) if path else (lambda i: route_path)
+    runs = []
+    await settle(client)
+    for run in range(args.warmup + args.repeat):
+        if route_path in SETUP:
+            await SETUP[route_path](postgrest, run * args.requests, args.requests)
+        result = await run_scenario(client, postgrest, method, url, payload, args.requests, args.concurrency, run * args.requests)
+        # Warm-up runs fill caches, connection pools and fake-table indexes, then are dropped.
+        if run >= args.warmup:
+            runs.append(result)
+    return median_run(runs)
+
+def report(route, result):
+    print(
+        f"{route:<40}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+        f"{result['rps']:>9}{result['db_calls_per_request']:>8}{result['errors']:>8}"
+    )
+
+async def main(args):
+    settings = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "db_latency_ms": args.db_latency,
+        "wiki_latency_ms": args.wiki_latency,
+        "warmup": args.warmup,
+        "repeat": args.repeat,
+    }
+    baseline = None
+    if not args.save_baseline and os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            print(f"baseline was recorded with {baseline['settings']}; not comparing\n")
+            baseline = None
+
+    ports = {"postgrest": free_port(), "wikipedia": free_port(), "app": free_port()}
+    cache_dir = tempfile.mkdtemp(prefix="fancloud-bench-")
+    context = {"images": f"http://127.0.0.1:{ports['wikipedia']}/images"}
+    base_env = {**os.environ, "PYTHONPATH": ROOT}
+    fake_env = {
+        **base_env,
+        "FAKE_POSTGREST_LATENCY_MS": str(args.db_latency),
+        "FAKE_WIKIPEDIA_LATENCY_MS": str(args.wiki_latency),
+    }
+    app_env = {
+        **base_env,
+        "SUPABASE_URL": f"http://127.0.0.1:{ports['postgrest']}",
+        "SUPABASE_KEY": FAKE_SUPABASE_KEY,
+        "WIKIPEDIA_API_URL": f"http://127.0.0.1:{ports['wikipedia']}/w/api.php",
+        "WIKIPEDIA_ARTICLE_URL": f"http://127.0.0.1:{ports['wikipedia']}/wiki/",
+        "WIKI_CACHE_PATH": os.path.join(cache_dir, "wiki_cache.sqlite3"),
+        "THUMB_CACHE_DIR": os.path.join(cache_dir, "thumbs"),
+        "THUMB_ALLOWED_HOSTS": "127.0.0.1",
+        # The fake upstream needs no politeness limits; keep the gateway from throttling the benchmark.
+        "WIKI_RATE": "100000",
+        "WIKI_BURST": "100000",
+        "WIKI_MAX_CONCURRENCY": "1000",
+    }
+    processes = [
+        start("bench.fake_postgrest:app", ports["postgrest"], fake_env),
+        start("bench.fake_wikipedia:app", ports["wikipedia"], fake_env),
+    ]
+    try:
+        await wait_until_up(f"http://127.0.0.1:{ports['postgrest']}/_stats")
+        await wait_until_up(f"http://127.0.0.1:{ports['wikipedia']}/_stats")
+        processes.append(start("main:app", ports["app"], app_env))
+        await wait_until_up(f"http://127.0.0.1:{ports['app']}/send")
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{ports['app']}", timeout=60, limits=limits) as client, \
+                httpx.AsyncClient(base_url=f"http://127.0.0.1:{ports['postgrest']}") as postgrest:
+            await seed(client, postgrest, context)
+            results = {}
+            print(f"{'route':<40}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'db/req':>8}{'errors':>8}")
+            scenarios = [
+                scenario for scenario in SCENARIOS
+                if not args.only or any(part in scenario[1] for part in args.only)
+            ]
+            for scenario in scenarios:
+                route = route_name(scenario)
+                results[route] = await measure(client, postgrest, scenario, args, context)
+                report(route, results[route])
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "routes": results}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nbaseline saved to {BASELINE_PATH}")
+        return 0
+
+    if baseline is not None:
+        regressions = compare(results, baseline["routes"], args.tolerance)
+        if regressions:
+            print("\nregressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nno regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for every FanCloud route.")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--db-latency", type=float, default=2.0, help="injected PostgREST latency in ms")
+    parser.add_argument("--wiki-latency", type=float, default=50.0, help="injected Wikipedia latency in ms")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded runs per route before measuring")
+    parser.add_argument("--repeat", type=int, default=5, help="measured runs per route; each metric is their median")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth before flagging a regression")
+    parser.add_argument("--only", nargs="+", help="only run routes whose path contains one of these strings")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {os.path.relpath(BASELINE_PATH, ROOT)}")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,73 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.legacy_parser import parse_wikipedia_html
+from service.wiki_extract import extract_wikipedia_info
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wikipedia")
+WIKIPEDIA_API_URL = "https://ja.wikipedia.org/w/api.php"
+REAL_ARTICLE_BYTES = 20 * 1024
+
+def download(titles):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with httpx.Client(headers={"User-Agent": "FanCloud-bench/1.0"}, timeout=30) as client:
+        for title in titles:
+            params = {"action": "parse", "format": "json", "formatversion": 2, "page": title, "prop": "text", "redirects": 1}
+            article = client.get(WIKIPEDIA_API_URL, params=params).json()["parse"]
+            path = os.path.join(FIXTURE_DIR, f"{article['pageid']}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(article["text"])
+            print(f"saved {title} -> {path}")
+
+def timed(fn, html, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(html)
+    return (time.perf_counter() - started) / repeat, result
+
+def run(repeat):
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not paths:
+        sys.exit(f"no fixtures in {FIXTURE_DIR}")
+
+    total_legacy = total_new = 0.0
+    mismatches = 0
+    print(f"{'fixture':<24}{'KiB':>8}{'bs4 ms':>10}{'stream ms':>11}{'speedup':>9}  parity")
+    for path in paths:
+        with open(path, "rb") as f:
+            html = f.read()
+        legacy_time, legacy = timed(parse_wikipedia_html, html, repeat)
+        new_time, new = timed(extract_wikipedia_info, html, repeat)
+        total_legacy += legacy_time
+        total_new += new_time
+        diff = {key: (legacy[key], new[key]) for key in legacy if legacy[key] != new[key]}
+        mismatches += bool(diff)
+        print(
+            f"{os.path.basename(path):<24}{len(html) / 1024:>8.1f}{legacy_time * 1000:>10.2f}"
+            f"{new_time * 1000:>11.2f}{legacy_time / new_time:>8.1f}x  {'ok' if not diff else 'DIFF'}"
+        )
+        for key, (old, current) in diff.items():
+            print(f"    {key}: bs4={json.dumps(old, ensure_ascii=False)} stream={json.dumps(current, ensure_ascii=False)}")
+
+    print(f"{'total':<32}{total_legacy * 1000:>10.2f}{total_new * 1000:>11.2f}{total_legacy / total_new:>8.1f}x  {len(paths) - mismatches}/{len(paths)} identical")
+    if max(os.path.getsize(path) for path in paths) < REAL_ARTICLE_BYTES:
+        # Real ja.wikipedia.org articles are tens to hundreds of KiB of parser output.
+        print("\nonly small hand-written fixtures found; save real articles with --download for representative numbers")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the streaming Wikipedia extractor with the BeautifulSoup parser.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--download", nargs="+", metavar="TITLE", help="save ja.wikipedia.org articles as fixtures first")
+    args = parser.parse_args()
+    if args.download:
+        download(args.download)
+    run(args.repeat)
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Header, Response
+import hashlib
+import hmac
+import os
+from typing import Union
+from model.calendar import CalendarRangeRequest, CalendarFeedRequest
+from service.clients import SUPABASE_KEY
+from service.identity import resolve_user_id
+from service.calendar import calendar_index, parse_day, public_event, render_ics
+from service.response_cache import etag_matches
+
+CALENDAR_FEED_SECRET = os.getenv("CALENDAR_FEED_SECRET") or SUPABASE_KEY or ""
+MAX_RANGE_DAYS = int(os.getenv("CALENDAR_MAX_RANGE_DAYS", "400"))
+
+router = APIRouter()
+
+def feed_token(user_id):
+    return hmac.new(CALENDAR_FEED_SECRET.encode(), str(user_id).encode(), hashlib.sha256).hexdigest()[:32]
+
+@router.post("/events")
+async def calendar_events(request: CalendarRangeRequest):
+    first, last = parse_day(request.start), parse_day(request.end)
+    if first is None or last is None:
+        raise HTTPException(status_code=400, detail="start and end must be ISO dates")
+    if last < first or (last - first).days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be between 0 and {MAX_RANGE_DAYS} days")
+    user_id = await resolve_user_id(request.email)
+    calendar = await calendar_index.get(user_id)
+    return {"events": [public_event(event) for event in calendar.between(first, last)]}
+
+@router.post("/feed-url")
+async def calendar_feed_url(request: CalendarFeedRequest):
+    user_id = await resolve_user_id(request.email)
+    return {"path": f"/calendar/feeds/{user_id}/{feed_token(user_id)}.ics"}
+
+@router.get("/feeds/{user_id}/{token}.ics")
+async def calendar_feed(user_id: str, token: str, if_none_match: Union[str, None] = Header(default=None)):
+    if not hmac.compare_digest(token, feed_token(user_id)):
+        raise HTTPException(status_code=404, detail="Calendar not found")
+    calendar = await calendar_index.get(user_id)
+    body, etag = render_ics(calendar)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
@@ -1,111 +1,394 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Header, Response
+import asyncio
+import json
+from typing import List, Union
 from uuid import UUID
-from supabase import create_client, Client
-import os
-from model.content import CreateContentRequest, FetchContentRequest, ContentData
+from model.content import CreateContentRequest, FetchContentRequest, ContentData, PatchContentRequest, SearchContentRequest
+from service.clients import get_supabase
+from service.identity import resolve_oshi, resolve_user_id
+from service.response_cache import content_cache, etag_matches
+from service.calendar import calendar_index, make_event
+from service.content_search import ContentSearchIndex, SEARCHABLE_TYPES
+from service.thumbnails import thumbnail_url
+from service.pagination import MAX_PAGE_SIZE, page_size, wants_ndjson, paged_rows, ndjson_response, after_cursor, encode_cursor
 
 router = APIRouter()
-supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
 
-async def get_oshi_id(email: str, oshi_name: str):
-    user_response = supabase.table("users").select("id").eq("email", email).execute()
-    if not user_response.data:
-        raise HTTPException(status_code=404, detail="User not found")
+SEARCH_RESULT_LIMIT = 20
 
-    user_id = user_response.data[0]["id"]
+DETAIL_TABLES = {
+    "text": "text_data",
+    "image": "image_data",
+    "event": "event_data",
+    "sns": "sns_data",
+}
 
-    oshi_response = supabase.table("oshi").select("id").eq("user_id", user_id).eq("oshi_name", oshi_name).execute()
-    if not oshi_response.data:
-        raise HTTPException(status_code=404, detail="Oshi not found")
+def build_detail_rows(content, content_id):
+    if content.type == "text":
+        return [{
+            "id": content_id,
+            "text": content.text,
+            "font_size": content.fontSize,
+            "alignment": content.alignment,
+        }]
+    elif content.type == "image":
+        return [{
+            "id": content_id,
+            "src": content.src,
+            "size": content.size,
+        }]
+    elif content.type == "event":
+        return [{
+            "id": content_id,
+            "title": content.title,
+            "start_date": content.start_date,
+            "end_date": content.end_date,
+            "count": content.count
+        }]
+    elif content.type == "sns":
+        return [{"id": content_id, "name": link.name, "url": link.url} for link in content.snsLinks]
+    return []
 
-    return oshi_response.data[0]["id"]
+async def rollback_content(content_ids):
+    supabase = await get_supabase()
+    # PostgREST has no cross-request transactions, so undo a failed batch by hand.
+    for table in DETAIL_TABLES.values():
+        try:
+            await supabase.table(table).delete().in_("id", content_ids).execute()
+        except Exception:
+            pass
+    try:
+        await supabase.table("content").delete().in_("id", content_ids).execute()
+    except Exception:
+        pass
+
+async def delete_content_for_oshi(oshi_ids):
+    supabase = await get_supabase()
+    content_response = await supabase.table("content").select("id").in_("oshi_id", [str(oshi_id) for oshi_id in oshi_ids]).execute()
+    content_ids = [row["id"] for row in content_response.data]
+    if not content_ids:
+        return []
+
+    await asyncio.gather(*(
+        supabase.table(table).delete().in_("id", content_ids).execute()
+        for table in DETAIL_TABLES.values()
+    ))
+    await supabase.table("content").delete().in_("id", content_ids).execute()
+    for oshi_id in oshi_ids:
+        content_cache.invalidate(str(oshi_id))
+    return content_ids
+
+async def insert_content_batch(oshi_id, contents):
+    if not contents:
+        return []
+
+    supabase = await get_supabase()
+    content_rows = [
+        {"oshi_id": str(oshi_id), "type": content.type, "order_index": content.order_index}
+        for content in contents
+    ]
+    response = await supabase.table("content").insert(content_rows).execute()
+    if len(response.data) != len(contents):
+        await rollback_content([row["id"] for row in response.data])
+        raise RuntimeError("Failed to create content rows")
+
+    content_ids = [row["id"] for row in response.data]
+    detail_rows = {table: [] for table in DETAIL_TABLES.values()}
+    for content, content_id in zip(contents, content_ids):
+        table = DETAIL_TABLES.get(content.type)
+        if table:
+            detail_rows[table].extend(build_detail_rows(content, content_id))
 
-@router.post("/create-content")
-async def create_content(request: CreateContentRequest):
     try:
-        oshi_id = await get_oshi_id(request.email, request.oshi_name)
+        for table, rows in detail_rows.items():
+            if rows:
+                await supabase.table(table).insert(rows).execute()
+    except Exception:
+        await rollback_content(content_ids)
+        raise
 
-        for content in request.content:
-            content_data = {
-                "oshi_id": str(oshi_id),
-                "type": content.type,
-                "order_index": content.order_index,
-            }
-            response = supabase.table("content").insert(content_data).execute()
-            content_id = response.data[0]["id"]
-
-            if content.type == "text":
-                text_data = {
-                    "id": content_id,
-                    "text": content.text,
-                    "font_size": content.fontSize,
-                    "alignment": content.alignment,
-                }
-                supabase.table("text_data").insert(text_data).execute()
-
-            elif content.type == "image":
-                image_data = {
-                    "id": content_id,
-                    "src": content.src,
-                    "size": content.size,
-                }
-                supabase.table("image_data").insert(image_data).execute()
-
-            elif content.type == "event":
-                event_data = {
-                    "id": content_id,
-                    "title": content.title,
-                    "start_date": content.start_date,
-                    "end_date": content.end_date,
-                    "count": content.count
-                }
-                supabase.table("event_data").insert(event_data).execute()
-
-            elif content.type == "sns":
-                for link in content.snsLinks:
-                    sns_data = {
-                        "id": content_id,
-                        "name": link.name,
-                        "url": link.url,
-                    }
-                    supabase.table("sns_data").insert(sns_data).execute()
+    return content_ids
 
+async def load_user_blocks(user_id):
+    supabase = await get_supabase()
+    oshi_response = await supabase.table("oshi").select("id", "oshi_name").eq("user_id", user_id).execute()
+    oshi_names = {str(oshi["id"]): oshi["oshi_name"] for oshi in oshi_response.data}
+    if not oshi_names:
+        return []
+    content_response = await supabase.table("content").select("*").in_("oshi_id", list(oshi_names)).in_("type", list(SEARCHABLE_TYPES)).execute()
+    blocks = await hydrate_content(content_response.data)
+    return [{**block, "oshi_name": oshi_names.get(str(block["oshi_id"]))} for block in blocks]
+
+search_index = ContentSearchIndex(load_user_blocks)
+
+def sync_user_indexes(user_id, oshi_id, oshi_name, blocks=(), removed_ids=(), moves=None):
+    # blocks are (content_id, ContentData) pairs that were inserted or rewritten.
+    blocks = list(blocks)
+    calendar_index.apply(
+        user_id,
+        events={
+            content_id: make_event(content_id, str(oshi_id), oshi_name, content.title, content.start_date, content.end_date, content.count)
+            for content_id, content in blocks
+            if content.type == "event"
+        },
+        removed_ids=removed_ids,
+    )
+    search_index.apply(
+        user_id,
+        added=[
+            {**content.model_dump(), "id": content_id, "oshi_id": str(oshi_id), "oshi_name": oshi_name}
+            for content_id, content in blocks
+        ],
+        removed_ids=removed_ids,
+        moves=moves,
+    )
+
+@router.post("/create-content")
+async def create_content(request: CreateContentRequest):
+    try:
+        user_id, oshi_id = await resolve_oshi(request.email, request.oshi_name)
+        try:
+            content_ids = await insert_content_batch(oshi_id, request.content)
+        finally:
+            content_cache.invalidate(str(oshi_id))
+        sync_user_indexes(user_id, oshi_id, request.oshi_name, zip(content_ids, request.content))
         return {"message": "All content created successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def fetch_detail_rows(content_rows):
+    ids_by_table = {}
+    for content in content_rows:
+        table = DETAIL_TABLES.get(content["type"])
+        if table:
+            ids_by_table.setdefault(table, []).append(content["id"])
+
+    supabase = await get_supabase()
+    responses = await asyncio.gather(*(
+        supabase.table(table).select("*").in_("id", content_ids).execute()
+        for table, content_ids in ids_by_table.items()
+    ))
+    return {table: response.data for table, response in zip(ids_by_table, responses)}
+
+def merge_content(content_rows, details):
+    rows_by_id = {}
+    sns_by_id = {}
+    for table, rows in details.items():
+        for row in rows:
+            if table == "sns_data":
+                sns_by_id.setdefault(row["id"], []).append({"name": row["name"], "url": row["url"]})
+            else:
+                rows_by_id[(table, row["id"])] = row
+
+    content_list = []
+    for content in content_rows:
+        content_type = content["type"]
+        if content_type == "sns":
+            content_list.append({**content, "snsLinks": sns_by_id.get(content["id"], [])})
+        elif content_type in DETAIL_TABLES:
+            detail = rows_by_id.get((DETAIL_TABLES[content_type], content["id"]), {})
+            if content_type == "image":
+                detail = {**detail, "thumbnail_url": thumbnail_url(detail.get("src"), detail.get("size"))}
+            content_list.append({**content, **detail})
+    return content_list
+
+async def hydrate_content(content_rows):
+    return merge_content(content_rows, await fetch_detail_rows(content_rows))
+
+async def fetch_content_page(oshi_id, cursor, limit):
+    supabase = await get_supabase()
+    query = supabase.table("content").select("*").eq("oshi_id", str(oshi_id)).order("order_index").order("id")
+    if cursor is not None:
+        query = after_cursor(query, "order_index", cursor)
+    content_rows = (await query.limit(limit).execute()).data
+    next_cursor = encode_cursor(content_rows[-1]["order_index"], content_rows[-1]["id"]) if len(content_rows) == limit else None
+    return await hydrate_content(content_rows), next_cursor
+
 @router.post("/fetch-content")
-async def fetch_content(request: FetchContentRequest):
+async def fetch_content(
+    request: FetchContentRequest,
+    if_none_match: Union[str, None] = Header(default=None),
+    accept: Union[str, None] = Header(default=None),
+):
     try:
-        oshi_id = await get_oshi_id(request.email, request.oshi_name)
+        user_id, oshi_id = await resolve_oshi(request.email, request.oshi_name)
+        limit = page_size(request.limit)
+
+        if wants_ndjson(accept):
+            page = lambda cursor, size: fetch_content_page(oshi_id, cursor, size)
+            return ndjson_response(paged_rows(page, request.cursor, limit))
+
+        if limit is not None or request.cursor is not None:
+            content_list, next_cursor = await fetch_content_page(oshi_id, request.cursor, limit or MAX_PAGE_SIZE)
+            return {"content": content_list, "next_cursor": next_cursor}
+
+        cached = content_cache.get(str(oshi_id))
+        if cached is not None:
+            body, etag = cached
+        else:
+            generation = content_cache.generation(str(oshi_id))
+            supabase = await get_supabase()
+            content_response = await supabase.table("content").select("*").eq("oshi_id", str(oshi_id)).order("order_index").execute()
+            content_list = await hydrate_content(content_response.data)
+            body = json.dumps({"content": content_list}, ensure_ascii=False, separators=(",", ":")).encode()
+            etag = content_cache.put(str(oshi_id), body, generation)
 
-        content_response = supabase.table("content").select("*").eq("oshi_id", str(oshi_id)).order("order_index").execute()
-        content_list = []
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
 
-        for content in content_response.data:
-            content_id = content["id"]
-            content_type = content["type"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+PATCH_OPERATIONS = ("insert", "update", "delete", "move")
 
-            if content_type == "text":
-                text_data = supabase.table("text_data").select("*").eq("id", content_id).execute().data[0]
-                content_list.append({**content, **text_data})
+def plan_patch(operations, existing):
+    inserts, updates, deletes, moves = [], {}, set(), {}
+    for operation in operations:
+        if operation.op not in PATCH_OPERATIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown operation: {operation.op}")
+        if operation.op == "insert":
+            if operation.content is None:
+                raise HTTPException(status_code=400, detail="insert requires content")
+            inserts.append(operation.content)
+            continue
 
-            elif content_type == "image":
-                image_data = supabase.table("image_data").select("*").eq("id", content_id).execute().data[0]
-                content_list.append({**content, **image_data})
+        content_id = str(operation.id)
+        if content_id not in existing or content_id in deletes:
+            raise HTTPException(status_code=404, detail=f"Content not found: {operation.id}")
+        if operation.op == "delete":
+            deletes.add(content_id)
+            updates.pop(content_id, None)
+            moves.pop(content_id, None)
+        elif operation.op == "update":
+            if operation.content is None:
+                raise HTTPException(status_code=400, detail="update requires content")
+            if operation.content.type != existing[content_id]["type"]:
+                raise HTTPException(status_code=400, detail="Block type cannot change; delete and insert instead")
+            updates[content_id] = operation.content
+            if operation.content.order_index != existing[content_id]["order_index"]:
+                moves[content_id] = operation.content.order_index
+        elif operation.op == "move":
+            if operation.order_index is None:
+                raise HTTPException(status_code=400, detail="move requires order_index")
+            moves[content_id] = operation.order_index
+    return inserts, updates, deletes, moves
 
-            elif content_type == "event":
-                event_data = supabase.table("event_data").select("*").eq("id", content_id).execute().data[0]
-                content_list.append({**content, **event_data})
+async def apply_patch(oshi_id, existing, inserts, updates, deletes, moves):
+    supabase = await get_supabase()
 
-            elif content_type == "sns":
-                sns_data_response = supabase.table("sns_data").select("*").eq("id", content_id).execute().data
-                sns_links = [{"name": link["name"], "url": link["url"]} for link in sns_data_response]
-                content_list.append({**content, "snsLinks": sns_links})
+    if deletes:
+        content_ids = [existing[content_id]["id"] for content_id in deletes]
+        await asyncio.gather(*(
+            supabase.table(table).delete().in_("id", content_ids).execute()
+            for table in DETAIL_TABLES.values()
+        ))
+        await supabase.table("content").delete().in_("id", content_ids).execute()
 
-        return {"content": content_list}
+    if updates:
+        detail_rows = {table: [] for table in DETAIL_TABLES.values()}
+        for content_id, content in updates.items():
+            detail_rows[DETAIL_TABLES[content.type]].extend(build_detail_rows(content, existing[content_id]["id"]))
+        sns_ids = [existing[content_id]["id"] for content_id, content in updates.items() if content.type == "sns"]
+        if sns_ids:
+            # A block owns several sns_data rows, so replace them instead of upserting.
+            await supabase.table("sns_data").delete().in_("id", sns_ids).execute()
+        for table, rows in detail_rows.items():
+            if not rows:
+                continue
+            if table == "sns_data":
+                await supabase.table(table).insert(rows).execute()
+            else:
+                await supabase.table(table).upsert(rows, on_conflict="id").execute()
 
+    if moves:
+        order_rows = [
+            {
+                "id": existing[content_id]["id"],
+                "oshi_id": str(oshi_id),
+                "type": existing[content_id]["type"],
+                "order_index": order_index,
+            }
+            for content_id, order_index in moves.items()
+        ]
+        await supabase.table("content").upsert(order_rows, on_conflict="id").execute()
+
+    return await insert_content_batch(oshi_id, inserts)
+
+async def restore_blocks(content_rows, rewritten, details):
+    # Puts touched blocks back as they were before a failed patch: content rows
+    # bring back deleted blocks and original positions, detail rows the old data
+    # of the rewritten (updated or deleted) blocks.
+    supabase = await get_supabase()
+    if content_rows:
+        await supabase.table("content").upsert(content_rows, on_conflict="id").execute()
+    # Links are keyed by block, which may have had none before the patch added some.
+    sns_ids = [row["id"] for row in rewritten if row["type"] == "sns"]
+    if sns_ids:
+        await supabase.table("sns_data").delete().in_("id", sns_ids).execute()
+    for table, rows in details.items():
+        if not rows:
+            continue
+        if table == "sns_data":
+            await supabase.table(table).insert(rows).execute()
+        else:
+            await supabase.table(table).upsert(rows, on_conflict="id").execute()
+
+@router.post("/patch-content")
+async def patch_content(request: PatchContentRequest):
+    user_id, oshi_id = await resolve_oshi(request.email, request.oshi_name)
+    supabase = await get_supabase()
+    content_response = await supabase.table("content").select("*").eq("oshi_id", str(oshi_id)).execute()
+    existing = {str(row["id"]): row for row in content_response.data}
+    # Every operation is validated before the first write.
+    inserts, updates, deletes, moves = plan_patch(request.operations, existing)
+
+    # PostgREST cannot wrap these writes in one transaction, so keep what they
+    # overwrite and write it back if a later step fails.
+    touched = [existing[content_id] for content_id in {*deletes, *updates, *moves}]
+    rewritten = [existing[content_id] for content_id in {*deletes, *updates}]
+    details = await fetch_detail_rows(rewritten)
+    try:
+        inserted_ids = await apply_patch(oshi_id, existing, inserts, updates, deletes, moves)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        try:
+            await restore_blocks(touched, rewritten, details)
+        except Exception as restore_error:
+            print(f"Failed to roll back patch for oshi {oshi_id}: {restore_error}")
+        calendar_index.invalidate(user_id)
+        search_index.invalidate(user_id)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        content_cache.invalidate(str(oshi_id))
+
+    sync_user_indexes(
+        user_id,
+        oshi_id,
+        request.oshi_name,
+        [(existing[content_id]["id"], content) for content_id, content in updates.items()] + list(zip(inserted_ids, inserts)),
+        removed_ids=[existing[content_id]["id"] for content_id in deletes],
+        moves={existing[content_id]["id"]: order_index for content_id, order_index in moves.items()},
+    )
+
+    return {
+        "message": "Content patched successfully",
+        "inserted": inserted_ids,
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "moved": len(moves),
+    }
+
+@router.post("/search")
+async def search_content(request: SearchContentRequest):
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="query must not be empty")
+    limit = page_size(request.limit) or SEARCH_RESULT_LIMIT
+    user_id = await resolve_user_id(request.email)
+    index = await search_index.get(user_id)
+    return {"hits": index.search(request.query, limit)}
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException
+import asyncio
+import os
+from model.dashboard import DashboardRequest
+from service.clients import get_supabase
+from service.identity import resolve_user_id
+from service.thumbnails import thumbnail_url
+from service.pagination import encode_cursor
+from handler.content import hydrate_content
+
+MAX_BLOCKS_PER_OSHI = int(os.getenv("MAX_BLOCKS_PER_OSHI", "50"))
+
+router = APIRouter()
+
+async def first_blocks(oshi_ids, count):
+    # One call for every oshi: dashboard_blocks (migrations/003) ranks each oshi's
+    # blocks and keeps count + 1 of them (the extra row only says whether there is
+    # more), then a single hydration pass fills in every kept block.
+    supabase = await get_supabase()
+    response = await supabase.rpc("dashboard_blocks", {"oshi_ids": oshi_ids, "per_oshi": count + 1}).select("id", "oshi_id", "type", "order_index").execute()
+    heads = {str(oshi_id): [] for oshi_id in oshi_ids}
+    for row in response.data:
+        heads[str(row["oshi_id"])].append(row)
+    kept = {oshi_id: rows[:count] for oshi_id, rows in heads.items()}
+    blocks = await hydrate_content([row for rows in kept.values() for row in rows])
+    by_oshi = {}
+    for block in blocks:
+        by_oshi.setdefault(str(block["oshi_id"]), []).append(block)
+    return {
+        oshi_id: {
+            "content": by_oshi.get(oshi_id, []),
+            "next_cursor": encode_cursor(rows[-1]["order_index"], rows[-1]["id"]) if len(heads[oshi_id]) > count else None,
+        }
+        for oshi_id, rows in kept.items()
+    }
+
+@router.post("/home")
+async def dashboard(request: DashboardRequest):
+    if not 0 <= request.blocks_per_oshi <= MAX_BLOCKS_PER_OSHI:
+        raise HTTPException(status_code=400, detail=f"blocks_per_oshi must be between 0 and {MAX_BLOCKS_PER_OSHI}")
+    user_id = await resolve_user_id(request.email)
+    supabase = await get_supabase()
+    genres_response, oshi_response = await asyncio.gather(
+        supabase.table('user_genres').select('genre_name').eq('user_id', user_id).execute(),
+        supabase.table('oshi').select('id', 'oshi_name', 'genres', 'image_url').eq('user_id', user_id).order('oshi_name').execute(),
+    )
+    genres = list(dict.fromkeys(genre['genre_name'] for genre in genres_response.data))
+
+    content = {}
+    if request.blocks_per_oshi and oshi_response.data:
+        content = await first_blocks([oshi['id'] for oshi in oshi_response.data], request.blocks_per_oshi)
+
+    # The user's chosen genres come first, then any genre only their oshi use.
+    oshi_by_genre = {genre: [] for genre in genres}
+    for oshi in oshi_response.data:
+        entry = {"oshi_name": oshi['oshi_name'], "genre": oshi['genres'], "image_url": oshi['image_url'], "thumbnail_url": thumbnail_url(oshi['image_url'])}
+        if request.blocks_per_oshi:
+            entry.update(content.get(str(oshi['id']), {"content": [], "next_cursor": None}))
+        oshi_by_genre.setdefault(oshi['genres'], []).append(entry)
+
+    return {"genres": genres, "oshi_by_genre": oshi_by_genre}
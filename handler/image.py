@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import RedirectResponse
+import re
+from typing import Union
+from service.response_cache import etag_matches
+from service.thumbnails import thumbnails, snap_width, pick_format, THUMB_FORMATS, THUMB_SIZES
+
+VARIANT_NAME = re.compile(r"^([0-9a-f]{64})-(\d+)\.(webp|jpeg)$")
+THUMB_REDIRECT_MAX_AGE = 60 * 60
+
+router = APIRouter()
+
+@router.get("/thumb")
+async def image_thumb(src: Union[str, None] = None, w: Union[int, None] = None, fmt: Union[str, None] = None,
+                      accept: Union[str, None] = Header(default=None)):
+    if fmt is not None and fmt not in THUMB_FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(THUMB_FORMATS)}")
+    name = await thumbnails.thumbnail(src, snap_width(w), pick_format(fmt, accept))
+    # The redirect depends on Accept and may change when the source does; the target never does.
+    # Kept short so a redirect never outlives the cached files behind its target for long.
+    return RedirectResponse(f"/image/v/{name}", status_code=302, headers={
+        "Cache-Control": f"public, max-age={THUMB_REDIRECT_MAX_AGE}",
+        "Vary": "Accept",
+    })
+
+@router.get("/v/{name}")
+async def image_variant(name: str, if_none_match: Union[str, None] = Header(default=None)):
+    match = VARIANT_NAME.match(name)
+    if match is None or int(match.group(2)) not in THUMB_SIZES:
+        raise HTTPException(status_code=404, detail="Image not found")
+    digest, width, fmt = match.group(1), int(match.group(2)), match.group(3)
+    headers = {"ETag": f'"{digest}-{width}-{fmt}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    try:
+        data = await thumbnails.variant(digest, width, fmt)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(content=data, media_type=THUMB_FORMATS[fmt], headers=headers)
@@ -1,131 +1,223 @@
-from fastapi import APIRouter, HTTPException
-import requests
-from bs4 import BeautifulSoup
-from supabase import create_client
-from model.oshi import SearchQuery, OshiRequest, UserOshiRequest, UserOshiAndGenresRequest
-from model.genres import UserOshiGenresRequest
-from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Header
+import asyncio
 import os
+import time
+from datetime import datetime, timezone
+from typing import Union
+from urllib.parse import quote
+from model.oshi import SearchQuery, OshiRequest, UserOshiRequest, UserOshiAndGenresRequest, BulkOshiImportRequest
+from model.genres import UserOshiGenresRequest
+from service.clients import get_supabase
+from service.wiki_cache import wiki_cache
+from service.wiki_gateway import wikipedia, UpstreamUnavailable
+from service.singleflight import SingleFlight
+from service.wiki_extract import extract_wikipedia_info, get_parse_pool
+from service.metrics import record_parse
+from service.response_cache import content_cache
+from service.thumbnails import thumbnail_url
+from service.pagination import MAX_PAGE_SIZE, page_size, wants_ndjson, paged_rows, ndjson_response, after_cursor, encode_cursor, filter_value
+from service.genre_registry import genre_registry
+from service.enrichment import EnrichmentWorker, is_permanent
+from service.calendar import calendar_index
+from service.autocomplete import autocomplete_index
+from service.identity import resolve_user_id, invalidate_oshi
+from handler.content import delete_content_for_oshi, search_index
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://ja.wikipedia.org/w/api.php")
+WIKIPEDIA_ARTICLE_URL = os.getenv("WIKIPEDIA_ARTICLE_URL", "https://ja.wikipedia.org/wiki/")
+ENRICH_STALE_AFTER = float(os.getenv("ENRICH_STALE_AFTER", str(7 * 24 * 60 * 60)))
+ENRICH_REFRESH_BATCH = int(os.getenv("ENRICH_REFRESH_BATCH", "100"))
+ENRICH_MAX_REFRESHES = int(os.getenv("ENRICH_MAX_REFRESHES", "5"))
+ENRICH_REFRESH_BACKOFF = float(os.getenv("ENRICH_REFRESH_BACKOFF", str(60 * 60)))
+WIKIPEDIA_TITLES_PER_QUERY = 50
+BULK_FETCH_CONCURRENCY = int(os.getenv("BULK_FETCH_CONCURRENCY", "8"))
+SEARCH_LIMIT = 4
+STALE_REFRESH_DEADLINE = float(os.getenv("STALE_REFRESH_DEADLINE", "1"))
+MAX_BULK_IMPORT = int(os.getenv("MAX_BULK_IMPORT", "100"))
+# Bulk upserts need every row to carry the same columns.
+OSHI_INFO_COLUMNS = ('official_site', 'sns_links', 'image_url', 'profession', 'summary', 'enriched_at', 'enrich_attempts', 'enrich_retry_at')
 
 router = APIRouter()
 
-def get_user_id(email):
-    user_data = supabase.table('users').select('id').eq('email', email).execute()
-    if not user_data.data or not user_data.data[0]:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user_data.data[0]['id']
+wiki_flights = {
+    "info": SingleFlight("info"),
+    "lookup": SingleFlight("lookup"),
+    "search": SingleFlight("search"),
+    "refresh": SingleFlight("refresh"),
+}
 
-def fetch_wikipedia_info(oshi_name):
-    wiki_url = "https://ja.wikipedia.org/w/api.php"
+async def fetch_wikipedia_page_info(oshi_name):
+    return await wiki_flights["info"].do(oshi_name, lambda: request_wikipedia_info(oshi_name))
+
+async def request_wikipedia_info(oshi_name):
     params = {
         "action": "query",
         "format": "json",
         "prop": "info",
         "titles": oshi_name,
-        "inprop": "url"
+        "inprop": "url",
+        # Same page as the parse API resolves, so lastrevid matches the cached revid.
+        "redirects": 1,
     }
-    response = requests.get(wiki_url, params=params)
+    response = await wikipedia.get(WIKIPEDIA_API_URL, params=params)
     data = response.json()
     pages = data.get("query", {}).get("pages", {})
     if not pages:
         raise HTTPException(status_code=404, detail="Wikipedia page not found")
     page = next(iter(pages.values()))
-    page_url = page.get("fullurl")
-    if not page_url:
+    if not page.get("fullurl"):
         raise HTTPException(status_code=404, detail="Wikipedia URL not found")
-    return page_url
-
-def parse_wikipedia_page(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    nationality = "Nationality not found"
-    infobox = soup.find("table", class_="infobox")
-    if infobox:
-        nationality_tag = infobox.find("th", text="国籍")
-        if nationality_tag:
-            nationality_data = nationality_tag.find_next_sibling("td")
-            if nationality_data:
-                nationality = nationality_data.get_text(strip=True)
-    official_site_tag = soup.find(class_="official-website")
-    official_site_url = official_site_tag.a['href'] if official_site_tag and official_site_tag.a else "Official site not found"
-    sns_links = extract_sns_links(soup)
-    image_url = None
-    if infobox:
-        image_tag = infobox.find("img")
-        if image_tag:
-            image_url = f"https:{image_tag['src']}"
-            if "Flag_of" in image_url:
-                image_url = "https://www.shoshinsha-design.com/wp-content/uploads/2020/05/%E3%83%8E%E3%83%BC%E3%82%A4%E3%83%A1%E3%83%BC%E3%82%B7%E3%82%99-760x460.png"
-        else:
-            image_url = "Image not found"
-    profession = "Profession not found"
-    if infobox:
-        profession_tag = infobox.find("th", text="職業")
-        if profession_tag:
-            profession_data = profession_tag.find_next_sibling("td")
-            if profession_data:
-                professions = profession_data.get_text(strip=True).split('、')
-                profession = ', '.join(professions)
-    summary = "Summary not found"
-    content_div = soup.find("div", class_="mw-parser-output")
-    if content_div:
-        summary_tag = content_div.find("p")
-        summary = summary_tag.get_text(strip=True) if summary_tag else "Summary not found"
-    return {
-        "official_site_url": official_site_url,
-        "sns_links": sns_links,
-        "image_url": image_url,
-        "profession": profession,
-        "summary": summary,
+    return page
+
+async def request_wikipedia_infos(titles):
+    params = {
+        "action": "query",
+        "format": "json",
+        "prop": "info",
+        "titles": "|".join(titles),
+        "inprop": "url",
+        "redirects": 1,
     }
+    response = await wikipedia.get(WIKIPEDIA_API_URL, params=params)
+    query = response.json().get("query", {})
+    pages = {page.get("title"): page for page in query.get("pages", {}).values()}
+    aliases = {}
+    for step in query.get("normalized", []) + query.get("redirects", []):
+        aliases[step["from"]] = step["to"]
+    found = {}
+    for title in titles:
+        resolved = title
+        while resolved in aliases and resolved not in pages:
+            resolved = aliases[resolved]
+        page = pages.get(resolved)
+        found[title] = page if page and "missing" not in page and page.get("fullurl") else None
+    return found
 
-def extract_sns_links(soup):
-    sns_links = {"youtube": None, "spotify": None, "soundcloud": None, "x": None, "instagram": None, "applemusic": None, "facebook": None}
-    for link in soup.find_all('a', href=True):
-        href = link['href']
-        if "references" in link.get('class', []):
-            continue
-        if "youtube.com" in href:
-            sns_links["youtube"] = href
-        elif "spotify.com" in href:
-            sns_links["spotify"] = href
-        elif "soundcloud.com" in href:
-            sns_links["soundcloud"] = href
-        elif "twitter.com" in href or "x.com" in href:
-            sns_links["x"] = href
-        elif "instagram.com" in href:
-            sns_links["instagram"] = href
-        elif "music.apple.com" in href:
-            sns_links["applemusic"] = href
-        elif "facebook.com" in href:
-            sns_links["facebook"] = href
-    return sns_links
+async def fetch_wikipedia_infos(titles):
+    batches = [titles[i:i + WIKIPEDIA_TITLES_PER_QUERY] for i in range(0, len(titles), WIKIPEDIA_TITLES_PER_QUERY)]
+    results = await asyncio.gather(*(request_wikipedia_infos(batch) for batch in batches))
+    return {title: page for result in results for title, page in result.items()}
 
-@router.post("/search-oshi")
-async def search_oshi(query: SearchQuery):
-    wikipedia_url = "https://ja.wikipedia.org/w/api.php"
-    params = {'action': 'query', 'list': 'search', 'srsearch': query.query, 'format': 'json', 'srlimit': 4}
-    response = requests.get(wikipedia_url, params=params)
+async def fetch_wikipedia_article(oshi_name):
+    params = {
+        "action": "parse",
+        "format": "json",
+        "formatversion": 2,
+        "page": oshi_name,
+        "prop": "text|revid",
+        "redirects": 1,
+        "disableeditsection": 1,
+        "disabletoc": 1,
+        "disablelimitreport": 1,
+    }
+    response = await wikipedia.get(WIKIPEDIA_API_URL, params=params)
+    data = response.json()
+    article = data.get("parse")
+    if not article or "text" not in article:
+        raise HTTPException(status_code=404, detail="Wikipedia page not found")
+    return article
+
+def wikipedia_article_url(title):
+    return WIKIPEDIA_ARTICLE_URL + quote(title.replace(" ", "_"), safe=":/()!,")
+
+async def extract_in_thread(html):
+    def timed_extract():
+        started = time.perf_counter()
+        try:
+            return extract_wikipedia_info(html)
+        finally:
+            record_parse(time.perf_counter() - started)
+    return await asyncio.to_thread(timed_extract)
+
+async def extract_in_pool(html):
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), extract_wikipedia_info, html)
+    finally:
+        record_parse(time.perf_counter() - started)
+
+async def lookup_wikipedia(oshi_name, allow_stale=True):
+    return await wiki_flights["lookup"].do((oshi_name, allow_stale), lambda: resolve_wikipedia(oshi_name, allow_stale))
+
+async def resolve_wikipedia(oshi_name, allow_stale=True):
+    entry = await wiki_cache.get(oshi_name)
+    if entry is not None and wiki_cache.is_fresh(entry):
+        return entry["url"], entry["info"]
+    if entry is None:
+        return await refresh_wikipedia(oshi_name, None)
+
+    # Stale-while-revalidate: the refresh keeps running in the background, but callers
+    # only wait for it briefly, and not at all while the upstream is known to be down.
+    refresh = asyncio.ensure_future(wiki_flights["refresh"].do(oshi_name, lambda: refresh_wikipedia(oshi_name, entry)))
+    refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+    if not allow_stale:
+        # The enrichment refresher stores what it gets as freshly enriched.
+        return await refresh
+    if wikipedia.healthy():
+        try:
+            return await asyncio.wait_for(asyncio.shield(refresh), STALE_REFRESH_DEADLINE)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            # Redirects are followed, so a 404 means the page is gone; anything else
+            # still leaves the stale entry worth serving.
+            if isinstance(e, HTTPException) and e.status_code == 404:
+                raise
+            print(f"Failed to refresh Wikipedia info for {oshi_name}: {e}")
+    wiki_cache.counters["served_stale"] += 1
+    return entry["url"], entry["info"]
+
+async def refresh_wikipedia(oshi_name, entry):
+    if entry is not None and entry["etag"]:
+        # Parse API responses carry no HTTP validators, so revalidate on the revision id.
+        page = await fetch_wikipedia_page_info(oshi_name)
+        if str(page.get("lastrevid")) == entry["etag"]:
+            wiki_cache.counters["revalidated"] += 1
+            await wiki_cache.touch(oshi_name, entry)
+            return entry["url"], entry["info"]
+        wiki_cache.counters["refetched"] += 1
+
+    article = await fetch_wikipedia_article(oshi_name)
+    page_url = wikipedia_article_url(article["title"])
+    wiki_info = await extract_in_thread(article["text"])
+    await wiki_cache.put(oshi_name, page_url, wiki_info, etag=str(article.get("revid", "")))
+    return page_url, wiki_info
+
+async def search_wikipedia(query):
+    params = {'action': 'query', 'list': 'search', 'srsearch': query, 'format': 'json', 'srlimit': SEARCH_LIMIT}
+    response = await wikipedia.get(WIKIPEDIA_API_URL, params=params)
     data = response.json()
     if 'query' in data and 'search' in data['query']:
         search_results = data['query']['search']
-        titles = [result['title'] for result in search_results]
-        return {'titles': titles}
+        return [result['title'] for result in search_results]
     else:
         raise HTTPException(status_code=500, detail="Failed to retrieve search results from Wikipedia")
 
+@router.post("/search-oshi")
+async def search_oshi(query: SearchQuery):
+    await autocomplete_index.ensure_loaded()
+    # Earlier Wikipedia answers for this query come first, then local prefix and fuzzy matches.
+    remembered = autocomplete_index.remembered(query.query)
+    titles = list(dict.fromkeys((remembered or []) + autocomplete_index.search(query.query, SEARCH_LIMIT)))[:SEARCH_LIMIT]
+    if remembered is not None or len(titles) >= SEARCH_LIMIT:
+        autocomplete_index.counters["local"] += 1
+        return {'titles': titles}
+
+    autocomplete_index.counters["upstream"] += 1
+    local_titles = titles
+    try:
+        titles = await wiki_flights["search"].do(query.query, lambda: search_wikipedia(query.query))
+    except UpstreamUnavailable:
+        if not local_titles:
+            raise
+        return {'titles': local_titles}
+    autocomplete_index.remember(query.query, titles)
+    return {'titles': list(dict.fromkeys(titles + local_titles))[:SEARCH_LIMIT]}
+
 @router.post("/fetch-oshi-info")
 async def fetch_oshi_info(request: OshiRequest):
     oshi_name = request.oshi_name
-    page_url = fetch_wikipedia_info(oshi_name)
-    wiki_info = parse_wikipedia_page(page_url)
+    page_url, wiki_info = await lookup_wikipedia(oshi_name)
     is_japanese = "Japan" in wiki_info.get("nationality", "")
     display_name = oshi_name if is_japanese else oshi_name
     return {
@@ -134,60 +226,244 @@ async def fetch_oshi_info(request: OshiRequest):
         **wiki_info
     }
 
+def oshi_row_info(wiki_info):
+    wiki_info = dict(wiki_info)
+    wiki_info['official_site'] = wiki_info.pop('official_site_url', None)
+    return {
+        **wiki_info,
+        'enrich_status': 'done',
+        'enriched_at': datetime.now(timezone.utc).isoformat(),
+        'enrich_attempts': 0,
+        'enrich_retry_at': None,
+    }
+
+async def enrich_oshi(oshi_id, oshi_name):
+    _, wiki_info = await lookup_wikipedia(oshi_name, allow_stale=False)
+    supabase = await get_supabase()
+    await supabase.table('oshi').update(oshi_row_info(wiki_info)).eq('id', oshi_id).execute()
+    autocomplete_index.include(oshi_name)
+
+def failure_info(attempts, error):
+    # A missing article will not appear by retrying; anything else is retried by the
+    # refresher with a doubling delay until ENRICH_MAX_REFRESHES runs out.
+    if is_permanent(error):
+        return {'enrich_status': 'not_found', 'enrich_attempts': attempts, 'enrich_retry_at': None}
+    if attempts >= ENRICH_MAX_REFRESHES:
+        return {'enrich_status': 'gave_up', 'enrich_attempts': attempts, 'enrich_retry_at': None}
+    retry_at = datetime.fromtimestamp(time.time() + ENRICH_REFRESH_BACKOFF * 2 ** (attempts - 1), timezone.utc)
+    return {'enrich_status': 'failed', 'enrich_attempts': attempts, 'enrich_retry_at': retry_at.isoformat()}
+
+async def mark_enrichment_failed(oshi_id, oshi_name, error=None):
+    supabase = await get_supabase()
+    current = await supabase.table('oshi').select('enrich_attempts').eq('id', oshi_id).execute()
+    attempts = (current.data[0].get('enrich_attempts') or 0) + 1 if current.data else 1
+    await supabase.table('oshi').update(failure_info(attempts, error)).eq('id', oshi_id).execute()
+
+enrichment = EnrichmentWorker(enrich_oshi, mark_enrichment_failed)
+
+async def refresh_stale_oshi():
+    # Picks up enriched rows that went stale, oldest first; rows left pending when the
+    # in-memory queue was lost on a restart; and failed rows whose retry time has come.
+    # Rows that failed for good (not_found, gave_up) are left alone.
+    now = time.time()
+    cutoff = datetime.fromtimestamp(now - ENRICH_STALE_AFTER, timezone.utc).isoformat()
+    due = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    supabase = await get_supabase()
+    rows = lambda: supabase.table('oshi').select('id', 'oshi_name')
+    stale, pending, failed = await asyncio.gather(
+        rows().eq('enrich_status', 'done').lt('enriched_at', cutoff).order('enriched_at').limit(ENRICH_REFRESH_BATCH).execute(),
+        rows().eq('enrich_status', 'pending').order('id').limit(ENRICH_REFRESH_BATCH).execute(),
+        rows().eq('enrich_status', 'failed').lt('enrich_attempts', ENRICH_MAX_REFRESHES)
+            .or_(f"enrich_retry_at.is.null,enrich_retry_at.lte.{filter_value(due)}")
+            .order('enrich_retry_at', nullsfirst=True).limit(ENRICH_REFRESH_BATCH).execute(),
+    )
+    for oshi in stale.data + pending.data + failed.data:
+        enrichment.enqueue(oshi['id'], oshi['id'], oshi['oshi_name'])
+
+async def cached_wiki_info(oshi_name):
+    entry = await wiki_cache.get(oshi_name)
+    if entry is not None and wiki_cache.is_fresh(entry):
+        return entry["info"]
+    return None
+
 @router.post("/save-oshi-info-and-genres")
 async def save_oshi_info_and_genres(request: UserOshiAndGenresRequest):
     email = request.email
     oshi_name = request.oshi_name
     genre = request.genre
-    user_id = get_user_id(email)
-    page_url = fetch_wikipedia_info(oshi_name)
-    wiki_info = parse_wikipedia_page(page_url)
-    valid_genres = supabase.table('genres').select('genre_name').execute()
-    valid_genre_names = {genre['genre_name'] for genre in valid_genres.data}
-    if genre not in valid_genre_names:
+    user_id = await resolve_user_id(email)
+    if await genre_registry.invalid_genres([genre]):
         raise HTTPException(status_code=400, detail=f"Invalid genre: {genre}")
-    wiki_info['official_site'] = wiki_info.pop('official_site_url', None)
-    oshi_data = supabase.table('oshi').select('id').eq('user_id', user_id).eq('oshi_name', oshi_name).execute()
+    # Usually fetch-oshi-info has just looked the page up; otherwise the worker fills it in.
+    wiki_info = await cached_wiki_info(oshi_name)
+    row_info = oshi_row_info(wiki_info) if wiki_info is not None else {'enrich_status': 'pending'}
+    supabase = await get_supabase()
+    oshi_data = await supabase.table('oshi').select('id').eq('user_id', user_id).eq('oshi_name', oshi_name).execute()
     if oshi_data.data and oshi_data.data[0]:
         oshi_id = oshi_data.data[0]['id']
-        response = supabase.table('oshi').update({**wiki_info, 'genres': genre}).eq('id', oshi_id).execute()
+        response = await supabase.table('oshi').update({**row_info, 'genres': genre}).eq('id', oshi_id).execute()
+        content_cache.invalidate(str(oshi_id))
     else:
-        response = supabase.table('oshi').insert({'user_id': user_id, 'oshi_name': oshi_name, 'genres': genre, **wiki_info}).execute()
+        response = await supabase.table('oshi').insert({'user_id': user_id, 'oshi_name': oshi_name, 'genres': genre, **row_info}).execute()
+    invalidate_oshi(user_id, [oshi_name])
+    if wiki_info is not None:
+        # Suggestions count each saved oshi once; re-saving only keeps the title present.
+        if oshi_data.data:
+            autocomplete_index.include(oshi_name)
+        else:
+            autocomplete_index.add(oshi_name)
     if response.data:
-        return {"message": "Oshi information and genre saved successfully", "genre": genre}
+        if row_info['enrich_status'] == 'pending':
+            oshi_id = response.data[0]['id']
+            enrichment.enqueue(oshi_id, oshi_id, oshi_name)
+        return {"message": "Oshi information and genre saved successfully", "genre": genre, "enrich_status": row_info['enrich_status']}
     else:
         raise HTTPException(status_code=500, detail="Failed to save oshi information and genre")
 
+async def import_wikipedia(oshi_name, page, semaphore):
+    entry = await wiki_cache.get(oshi_name)
+    if entry is not None and (wiki_cache.is_fresh(entry) or entry["etag"] == str(page.get("lastrevid"))):
+        if not wiki_cache.is_fresh(entry):
+            wiki_cache.counters["revalidated"] += 1
+            await wiki_cache.touch(oshi_name, entry)
+        return entry["info"]
+    async with semaphore:
+        article = await fetch_wikipedia_article(page["title"])
+    wiki_info = await extract_in_pool(article["text"])
+    await wiki_cache.put(oshi_name, wikipedia_article_url(article["title"]), wiki_info, etag=str(article.get("revid", "")))
+    return wiki_info
+
+@router.post("/import-oshi")
+async def import_oshi(request: BulkOshiImportRequest):
+    items = list({item.oshi_name: item for item in request.oshi}.values())
+    if not items:
+        raise HTTPException(status_code=400, detail="No oshi to import")
+    if len(items) > MAX_BULK_IMPORT:
+        raise HTTPException(status_code=400, detail=f"Cannot import more than {MAX_BULK_IMPORT} oshi at once")
+    invalid = await genre_registry.invalid_genres({item.genre for item in items})
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid genre: {', '.join(sorted(invalid))}")
+    user_id = await resolve_user_id(request.email)
+
+    names = [item.oshi_name for item in items]
+    pages = await fetch_wikipedia_infos(names)
+    semaphore = asyncio.Semaphore(BULK_FETCH_CONCURRENCY)
+    found = [name for name in names if pages[name] is not None]
+    infos = await asyncio.gather(*(import_wikipedia(name, pages[name], semaphore) for name in found), return_exceptions=True)
+    infos = dict(zip(found, infos))
+
+    empty_info = {column: None for column in OSHI_INFO_COLUMNS}
+    rows, statuses = {}, {}
+    for item in items:
+        wiki_info = infos.get(item.oshi_name)
+        if item.oshi_name not in infos:
+            statuses[item.oshi_name] = 'not_found'
+            row_info = {**empty_info, 'enrich_status': 'not_found'}
+        elif isinstance(wiki_info, Exception):
+            # Transient upstream errors go to the background worker instead of failing the import.
+            statuses[item.oshi_name] = 'pending'
+            row_info = {**empty_info, 'enrich_status': 'pending'}
+        else:
+            statuses[item.oshi_name] = 'imported'
+            row_info = oshi_row_info(wiki_info)
+        rows[item.oshi_name] = {'user_id': user_id, 'oshi_name': item.oshi_name, 'genres': item.genre, **row_info}
+
+    # New names are inserted in one statement; ON CONFLICT DO NOTHING returns only
+    # those, so whatever is missing from the response already existed. Only a
+    # successful lookup may overwrite Wikipedia fields of an existing row; the
+    # others just get the genre.
+    supabase = await get_supabase()
+    inserted = await supabase.table('oshi').upsert(
+        list(rows.values()), on_conflict='user_id,oshi_name', ignore_duplicates=True
+    ).execute()
+    new_ids = {oshi['oshi_name']: oshi['id'] for oshi in inserted.data}
+    existing = [name for name in names if name not in new_ids]
+    updates = [
+        [rows[name] for name in existing if statuses[name] == 'imported'],
+        [{key: rows[name][key] for key in ('user_id', 'oshi_name', 'genres')} for name in existing if statuses[name] != 'imported'],
+    ]
+    responses = await asyncio.gather(*(
+        supabase.table('oshi').upsert(update, on_conflict='user_id,oshi_name').execute()
+        for update in updates if update
+    ))
+    invalidate_oshi(user_id, names)
+    for name in names:
+        if statuses[name] == 'imported' and name in new_ids:
+            autocomplete_index.add(name)
+        elif statuses[name] == 'imported':
+            autocomplete_index.include(name)
+    oshi_ids = {**new_ids, **{oshi['oshi_name']: oshi['id'] for response in responses for oshi in response.data}}
+    for name in names:
+        if statuses[name] == 'pending' and name in oshi_ids:
+            enrichment.enqueue(oshi_ids[name], oshi_ids[name], name)
+
+    return {
+        "results": [
+            {
+                "oshi_name": name,
+                "status": statuses[name],
+                "wikipedia_url": pages[name]["fullurl"] if pages[name] else None,
+            }
+            for name in names
+        ]
+    }
+
+async def fetch_oshi_page(user_id, cursor, limit):
+    supabase = await get_supabase()
+    query = supabase.table('oshi').select('id', 'oshi_name', 'genres', 'image_url').eq('user_id', user_id).order('oshi_name').order('id')
+    if cursor is not None:
+        query = after_cursor(query, 'oshi_name', cursor)
+    oshi_data = await query.limit(limit).execute()
+    oshi_genres = [{"oshi_name": oshi['oshi_name'], "genre": oshi['genres'], "image_url": oshi['image_url'], "thumbnail_url": thumbnail_url(oshi['image_url'])} for oshi in oshi_data.data]
+    last = oshi_data.data[-1] if len(oshi_data.data) == limit else None
+    next_cursor = encode_cursor(last['oshi_name'], last['id']) if last else None
+    return oshi_genres, next_cursor
+
 @router.post("/get-user-oshi-genres")
-async def get_user_oshi_genres(request: UserOshiGenresRequest):
+async def get_user_oshi_genres(request: UserOshiGenresRequest, accept: Union[str, None] = Header(default=None)):
     email = request.email
-    user_id = get_user_id(email)
-    oshi_data = supabase.table('oshi').select('oshi_name', 'genres', 'image_url').eq('user_id', user_id).execute()
-    oshi_genres = [{"oshi_name": oshi['oshi_name'], "genre": oshi['genres'], "image_url": oshi['image_url']} for oshi in oshi_data.data]
+    user_id = await resolve_user_id(email)
+    limit = page_size(request.limit)
+
+    if wants_ndjson(accept):
+        page = lambda cursor, size: fetch_oshi_page(user_id, cursor, size)
+        return ndjson_response(paged_rows(page, request.cursor, limit))
+
+    if limit is not None or request.cursor is not None:
+        oshi_genres, next_cursor = await fetch_oshi_page(user_id, request.cursor, limit or MAX_PAGE_SIZE)
+        return {"oshi": oshi_genres, "next_cursor": next_cursor}
+
+    supabase = await get_supabase()
+    oshi_data = await supabase.table('oshi').select('oshi_name', 'genres', 'image_url').eq('user_id', user_id).execute()
+    oshi_genres = [{"oshi_name": oshi['oshi_name'], "genre": oshi['genres'], "image_url": oshi['image_url'], "thumbnail_url": thumbnail_url(oshi['image_url'])} for oshi in oshi_data.data]
     return {"oshi": oshi_genres}
 
 @router.post("/delete-oshi")
 async def delete_oshi(request: UserOshiRequest):
     email = request.email
     oshi_names = request.oshi_names
-    user_id = get_user_id(email)
+    user_id = await resolve_user_id(email)
+    supabase = await get_supabase()
 
-    deleted_oshi = []
-    not_found_oshi = []
+    oshi_data = await supabase.table('oshi').select('id', 'oshi_name').eq('user_id', user_id).in_('oshi_name', oshi_names).execute()
+    found_oshi = {oshi['oshi_name']: oshi['id'] for oshi in oshi_data.data}
+    deleted_oshi = [oshi_name for oshi_name in dict.fromkeys(oshi_names) if oshi_name in found_oshi]
+    not_found_oshi = [oshi_name for oshi_name in oshi_names if oshi_name not in found_oshi]
 
-    for oshi_name in oshi_names:
-        oshi_data = supabase.table('oshi').select('id').eq('user_id', user_id).eq('oshi_name', oshi_name).execute()
-        if not oshi_data.data or not oshi_data.data[0]:
-            not_found_oshi.append(oshi_name)
-            continue
+    if found_oshi:
+        oshi_ids = list(found_oshi.values())
+        await delete_content_for_oshi(oshi_ids)
+        response = await supabase.table('oshi').delete().in_('id', oshi_ids).execute()
+        for oshi_id in oshi_ids:
+            content_cache.invalidate(str(oshi_id))
+        invalidate_oshi(user_id, found_oshi)
+        calendar_index.remove_oshi(user_id, oshi_ids)
+        search_index.remove_oshi(user_id, oshi_ids)
+        for oshi_name in deleted_oshi:
+            autocomplete_index.discard(oshi_name)
+        if len(response.data) != len(oshi_ids):
+            raise HTTPException(status_code=500, detail=f"Failed to delete oshi {', '.join(deleted_oshi)}")
 
-        oshi_id = oshi_data.data[0]['id']
-        response = supabase.table('oshi').delete().eq('id', oshi_id).execute()
-        if response.data:
-            deleted_oshi.append(oshi_name)
-        else:
-            raise HTTPException(status_code=500, detail=f"Failed to delete oshi {oshi_name}")
-        
     if deleted_oshi and not not_found_oshi:
         return {
             "status": "success",
@@ -1,7 +1,36 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from service.wiki_cache import wiki_cache
+from service.wiki_gateway import wikipedia
+from handler.oshi import wiki_flights, enrichment
+from handler.content import search_index
+from service import identity, metrics
+from service.response_cache import content_cache
+from service.calendar import calendar_index
+from service.autocomplete import autocomplete_index
+from service.thumbnails import thumbnails
 
 router  = APIRouter()
 
 @router.api_route("/send", methods=["GET", "HEAD"])
 async def keep_alive():
-    return {"message": "APP is active"}
\ No newline at end of file
+    return {"message": "APP is active"}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return {
+        "wikipedia": wiki_cache.stats(),
+        "wikipedia_gateway": wikipedia.stats(),
+        "identity": identity.stats(),
+        "content": content_cache.stats(),
+        "singleflight": {name: flight.stats() for name, flight in wiki_flights.items()},
+        "enrichment": enrichment.stats(),
+        "calendar": calendar_index.stats(),
+        "autocomplete": autocomplete_index.stats(),
+        "content_search": search_index.stats(),
+        "thumbnails": thumbnails.stats(),
+    }
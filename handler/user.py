@@ -1,20 +1,11 @@
 from fastapi import APIRouter, HTTPException
-from supabase import create_client, Client
 import uuid
 import hashlib
-import os
-from dotenv import load_dotenv
-import supabase
 from model.user import UserCreate, UserLogin
 from fastapi.responses import RedirectResponse
 from fastapi import Request
-
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from service.clients import SUPABASE_URL, get_supabase
+from service.identity import invalidate_user
 
 router = APIRouter()
 
@@ -26,12 +17,14 @@ async def register_user(user: UserCreate):
     user_id = str(uuid.uuid4())
     hashed_password = hash_password(user.password)
 
-    response = supabase.table('users').insert({
+    supabase = await get_supabase()
+    response = await supabase.table('users').insert({
         'id': user_id,
         'email': user.email,
         'password': hashed_password,
         'username': user.username
     }).execute()
+    invalidate_user(user.email)
 
     if response.data:
         return {
@@ -48,7 +41,8 @@ async def register_user(user: UserCreate):
 @router.post("/login")
 async def login(user: UserLogin):
 
-    response = supabase.table('users').select('email', 'password', 'username').eq('email', user.email).execute()
+    supabase = await get_supabase()
+    response = await supabase.table('users').select('email', 'password', 'username').eq('email', user.email).execute()
 
     if not response.data or not response.data[0]:
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -76,7 +70,8 @@ async def google_auth_callback(request: Request, token: str = None):
         print(f"Request: {request.query_params}")
         raise HTTPException(status_code=400, detail="Token is missing")
     
-    user_info = supabase.auth.api.get_user(token)
+    supabase = await get_supabase()
+    user_info = await supabase.auth.get_user(token)
 
     if not user_info:
         raise HTTPException(status_code=401, detail="Google authentication failed")
@@ -1,13 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import os
 from dotenv import load_dotenv
 from handler.user import router as user_router
 from handler.genre import router as genre_router
-from handler.oshi import router as oshi_router
+from handler.oshi import router as oshi_router, WIKIPEDIA_API_URL, enrichment, refresh_stale_oshi
 from handler.system import router as system_router
 from handler.content import router as content_router
+from handler.calendar import router as calendar_router
+from handler.dashboard import router as dashboard_router
+from handler.image import router as image_router
+from service.clients import close_clients
+from service.wiki_gateway import wikipedia
+from service.genre_registry import preload_genres
+from service.autocomplete import preload_autocomplete
+from service.metrics import MetricsMiddleware
+from service.enrichment import run_periodically
+from service.wiki_extract import shutdown_parse_pool
+from service.thumbnails import thumbnails
 
 load_dotenv()
 
@@ -15,43 +27,79 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 SEARCH_ENGINE_ID = os.getenv("GOOGLE_CSE_ID")
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+ENRICH_REFRESH_INTERVAL = float(os.getenv("ENRICH_REFRESH_INTERVAL", "3600"))
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-app = FastAPI(debug=True)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "https://fancloud.vercel.app",
-        ""
-    ],
-    allow_credentials=True,
-    allow_methods=["*"], 
-    allow_headers=["*"],
-)
-
-@app.get("/", tags=["Default"])
-async def root():
-    return {
-        "message": (
-            "Welcome to FanCloud!\n\n"
-            "FanCloudは、あなたの推し情報をまとめ、ジャンル別に管理できるプラットフォームです。\n"
-            "ユーザーはお気に入りのアーティストやキャラクターに関するノートを作成し、"
-            "画像やイベント情報を追加できます。\n"
-            "シンプルでおしゃれなUIが、楽しいファンライフをサポートします。\n\n"
-            "主な機能:\n"
-            "- ユーザー認証とGoogleログイン\n"
-            "- ジャンル別に推し情報を管理\n"
-            "- 画像やイベントの追加機能\n"
-            "- シンプルでおしゃれなUIデザイン\n\n"
-            "📄 詳細なAPIドキュメントは /docs で確認できます。"
-        )
-    }
-
-app.include_router(system_router, tags=["System"])
-app.include_router(user_router, prefix="/user", tags=["User"])
-app.include_router(genre_router, prefix="/genre", tags=["Genre"])
-app.include_router(oshi_router, prefix="/oshi", tags=["Oshi"])
-app.include_router(content_router, prefix="/content", tags=["Content"])
\ No newline at end of file
+async def preopen_wikipedia():
+    try:
+        await wikipedia.request("HEAD", WIKIPEDIA_API_URL)
+    except Exception as e:
+        print(f"Failed to pre-open Wikipedia connection: {e}")
+
+async def warm_up():
+    # Loading the genre registry also creates the Supabase client and opens its first pooled connection.
+    await asyncio.gather(preload_genres(), preload_autocomplete(), preopen_wikipedia())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_UP_ON_STARTUP:
+        await warm_up()
+    enrichment.start()
+    refresher = asyncio.create_task(run_periodically(ENRICH_REFRESH_INTERVAL, refresh_stale_oshi)) if ENRICH_REFRESH_INTERVAL > 0 else None
+    yield
+    if refresher is not None:
+        # Let a refresh that is mid-flight unwind before the clients it uses are closed.
+        refresher.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresher
+    await enrichment.stop()
+    shutdown_parse_pool()
+    thumbnails.shutdown()
+    await close_clients()
+
+def create_app() -> FastAPI:
+    app = FastAPI(debug=True, lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",
+            "https://fancloud.vercel.app",
+            ""
+        ],
+        allow_credentials=True,
+        allow_methods=["*"], 
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/", tags=["Default"])
+    async def root():
+        return {
+            "message": (
+                "Welcome to FanCloud!\n\n"
+                "FanCloudは、あなたの推し情報をまとめ、ジャンル別に管理できるプラットフォームです。\n"
+                "ユーザーはお気に入りのアーティストやキャラクターに関するノートを作成し、"
+                "画像やイベント情報を追加できます。\n"
+                "シンプルでおしゃれなUIが、楽しいファンライフをサポートします。\n\n"
+                "主な機能:\n"
+                "- ユーザー認証とGoogleログイン\n"
+                "- ジャンル別に推し情報を管理\n"
+                "- 画像やイベントの追加機能\n"
+                "- シンプルでおしゃれなUIデザイン\n\n"
+                "📄 詳細なAPIドキュメントは /docs で確認できます。"
+            )
+        }
+
+    app.include_router(system_router, tags=["System"])
+    app.include_router(user_router, prefix="/user", tags=["User"])
+    app.include_router(genre_router, prefix="/genre", tags=["Genre"])
+    app.include_router(oshi_router, prefix="/oshi", tags=["Oshi"])
+    app.include_router(content_router, prefix="/content", tags=["Content"])
+    app.include_router(calendar_router, prefix="/calendar", tags=["Calendar"])
+    app.include_router(dashboard_router, prefix="/dashboard", tags=["Dashboard"])
+    app.include_router(image_router, prefix="/image", tags=["Image"])
+
+    return app
+
+app = create_app()
@@ -0,0 +1,18 @@
+-- Columns the background enrichment worker and refresher read and write
+-- (handler/oshi.py: oshi_row_info, failure_info, refresh_stale_oshi).
+alter table oshi
+    add column if not exists enrich_status text,
+    add column if not exists enriched_at timestamptz,
+    add column if not exists enrich_attempts integer not null default 0,
+    add column if not exists enrich_retry_at timestamptz;
+
+alter table oshi
+    add constraint oshi_enrich_status_check
+    check (enrich_status in ('pending', 'done', 'failed', 'not_found', 'gave_up'));
+
+-- Rows saved before the worker existed were filled in synchronously.
+update oshi set enrich_status = 'done', enriched_at = now() where enrich_status is null;
+
+-- The refresher picks rows by status, oldest enrichment or earliest retry first.
+create index if not exists oshi_enrich_status_enriched_at_idx on oshi (enrich_status, enriched_at);
+create index if not exists oshi_enrich_status_retry_at_idx on oshi (enrich_status, enrich_retry_at);
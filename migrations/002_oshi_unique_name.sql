@@ -0,0 +1,8 @@
+-- /oshi/import-oshi upserts on (user_id, oshi_name), which PostgREST can only do
+-- against a matching unique constraint.
+--
+-- Merge any duplicates first; this lists them:
+--   select user_id, oshi_name, array_agg(id order by id)
+--   from oshi group by user_id, oshi_name having count(*) > 1;
+alter table oshi
+    add constraint oshi_user_id_oshi_name_key unique (user_id, oshi_name);
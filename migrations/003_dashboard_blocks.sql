@@ -0,0 +1,19 @@
+-- The first per_oshi blocks of each of the given oshi, in page order, for
+-- /dashboard/home (handler/dashboard.py: first_blocks). One call covers every oshi.
+create or replace function dashboard_blocks(oshi_ids bigint[], per_oshi integer)
+returns setof content
+language sql stable
+as $$
+    select content.*
+    from content
+    join (
+        select id, row_number() over (partition by oshi_id order by order_index, id) as position
+        from content
+        where oshi_id = any(oshi_ids)
+    ) ranked on ranked.id = content.id
+    where ranked.position <= per_oshi
+    order by content.oshi_id, content.order_index, content.id;
+$$;
+
+-- Serves both the window above and the keyset pages of /content/fetch-content.
+create index if not exists content_oshi_id_order_idx on content (oshi_id, order_index, id);
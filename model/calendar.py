@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+class CalendarRangeRequest(BaseModel):
+    email: str
+    start: str
+    end: str
+
+class CalendarFeedRequest(BaseModel):
+    email: str
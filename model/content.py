@@ -40,4 +40,23 @@ class CreateContentRequest(BaseModel):
 
 class FetchContentRequest(BaseModel):
     email: str
-    oshi_name: str
\ No newline at end of file
+    oshi_name: str
+    cursor: Union[str, None] = None
+    limit: Union[int, None] = None
+
+class ContentOperation(BaseModel):
+    op: str
+    id: Union[int, str, None] = None
+    content: Union[ContentData, None] = None
+    order_index: Union[int, None] = None
+
+class PatchContentRequest(BaseModel):
+    email: str
+    oshi_name: str
+    operations: List[ContentOperation]
+
+
+class SearchContentRequest(BaseModel):
+    email: str
+    query: str
+    limit: Union[int, None] = None
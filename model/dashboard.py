@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+
+class DashboardRequest(BaseModel):
+    email: str
+    blocks_per_oshi: int = 0
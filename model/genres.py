@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Union
 
 class UserGenres(BaseModel):
     email: str
@@ -6,6 +7,8 @@ class UserGenres(BaseModel):
 
 class UserOshiGenresRequest(BaseModel):
     email: str   
+    cursor: Union[str, None] = None
+    limit: Union[int, None] = None
     
 class EmailRequest(BaseModel):
     email: str 
\ No newline at end of file
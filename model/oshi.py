@@ -14,4 +14,12 @@ class UserOshiRequest(BaseModel):
 class UserOshiAndGenresRequest(BaseModel):
     email: str
     oshi_name: str
-    genre: str  
\ No newline at end of file
+    genre: str  
+
+class OshiImportItem(BaseModel):
+    oshi_name: str
+    genre: str
+
+class BulkOshiImportRequest(BaseModel):
+    email: str
+    oshi: List[OshiImportItem]
@@ -0,0 +1,164 @@
+import asyncio
+import bisect
+import heapq
+import os
+import time
+import unicodedata
+from service.cache import TTLCache
+from service.clients import get_supabase
+from service.wiki_cache import wiki_cache
+
+AUTOCOMPLETE_MAX_TITLES = int(os.getenv("AUTOCOMPLETE_MAX_TITLES", "50000"))
+AUTOCOMPLETE_QUERY_TTL = float(os.getenv("AUTOCOMPLETE_QUERY_TTL", str(24 * 60 * 60)))
+FUZZY_THRESHOLD = 0.5
+LOAD_RETRY_DELAY = 60
+IGNORED_CHARS = frozenset(" 　・･-_()（）「」『』")
+
+def normalize(text):
+    # Width and compatibility forms fold through NFKC, katakana folds to hiragana
+    # and separators are dropped, so "ﾎｼﾉ ｹﾞﾝ", "ホシノゲン" and "ほしのげん" share a key.
+    text = unicodedata.normalize("NFKC", text).casefold()
+    chars = []
+    for char in text:
+        if char in IGNORED_CHARS:
+            continue
+        code = ord(char)
+        if 0x30A1 <= code <= 0x30F6:
+            char = chr(code - 0x60)
+        chars.append(char)
+    return "".join(chars)
+
+def bigrams(key):
+    return {key[i:i + 2] for i in range(len(key) - 1)} or {key}
+
+class AutocompleteIndex:
+    def __init__(self, max_titles=AUTOCOMPLETE_MAX_TITLES, query_ttl=AUTOCOMPLETE_QUERY_TTL):
+        self.max_titles = max_titles
+        self.keys = []
+        self.titles = {}
+        self.grams = {}
+        self.weights = {}
+        self.searched = TTLCache(maxsize=max_titles, ttl=query_ttl)
+        self.loaded_at = None
+        self.failed_at = None
+        self._lock = asyncio.Lock()
+        self.counters = {"local": 0, "upstream": 0}
+
+    def add(self, title, weight=1):
+        key = normalize(title)
+        if not key:
+            return
+        if title in self.weights:
+            self.weights[title] += weight
+            return
+        if len(self.weights) >= self.max_titles:
+            return
+        self.weights[title] = weight
+        if key not in self.titles:
+            bisect.insort(self.keys, key)
+            self.titles[key] = []
+            for gram in bigrams(key):
+                self.grams.setdefault(gram, set()).add(key)
+        self.titles[key].append(title)
+
+    def include(self, title):
+        # Makes sure a title is searchable without counting it again.
+        if title not in self.weights:
+            self.add(title)
+
+    def discard(self, title, weight=1):
+        if title not in self.weights:
+            return
+        self.weights[title] -= weight
+        if self.weights[title] > 0:
+            return
+        del self.weights[title]
+        key = normalize(title)
+        self.titles[key].remove(title)
+        if not self.titles[key]:
+            del self.titles[key]
+            del self.keys[bisect.bisect_left(self.keys, key)]
+            for gram in bigrams(key):
+                self.grams[gram].discard(key)
+                if not self.grams[gram]:
+                    del self.grams[gram]
+
+    def remember(self, query, titles):
+        for title in titles:
+            self.add(title)
+        self.searched.set(normalize(query), list(titles))
+
+    def remembered(self, query):
+        return self.searched.get(normalize(query))
+
+    def _rank(self, keys, limit):
+        titles = (title for key in keys for title in self.titles[key])
+        return heapq.nsmallest(limit, titles, key=lambda title: (-self.weights[title], len(title)))
+
+    def search(self, query, limit):
+        key = normalize(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_left(self.keys, key + "\uffff")
+        results = self._rank(self.keys[start:end], limit)
+        if len(results) >= limit:
+            return results
+
+        # Substring and near matches, found through shared character bigrams.
+        query_grams = bigrams(key)
+        counts = {}
+        for gram in query_grams:
+            for candidate in self.grams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        prefix_keys = set(self.keys[start:end])
+        scored = []
+        for candidate, shared in counts.items():
+            if candidate in prefix_keys:
+                continue
+            score = 1.0 if key in candidate else 2 * shared / (len(query_grams) + len(bigrams(candidate)))
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, candidate))
+        scored.sort()
+        for _, candidate in scored:
+            results.extend(self._rank([candidate], limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
+
+    async def ensure_loaded(self):
+        # Search still works from Wikipedia while the database is unreachable; retry the load later.
+        if self.loaded_at is not None or (self.failed_at and time.monotonic() - self.failed_at < LOAD_RETRY_DELAY):
+            return
+        async with self._lock:
+            if self.loaded_at is None:
+                try:
+                    await self.load()
+                except Exception as e:
+                    self.failed_at = time.monotonic()
+                    print(f"Failed to load autocomplete index: {e}")
+
+    async def load(self, page_size=1000):
+        # The index is shared by every user, so it only learns names Wikipedia knows:
+        # titles in the wiki cache, plus one weight per oshi whose enrichment found a
+        # page. Free-text names that only exist in someone's list never show up.
+        for title in await wiki_cache.titles():
+            self.add(title)
+        supabase = await get_supabase()
+        offset = 0
+        while True:
+            response = await supabase.table('oshi').select('oshi_name').eq('enrich_status', 'done').order('id').range(offset, offset + page_size - 1).execute()
+            for oshi in response.data:
+                self.add(oshi['oshi_name'])
+            if len(response.data) < page_size:
+                break
+            offset += page_size
+        self.loaded_at = time.monotonic()
+
+    def stats(self):
+        return {**self.counters, "titles": len(self.weights), "keys": len(self.keys), "remembered_queries": len(self.searched)}
+
+autocomplete_index = AutocompleteIndex()
+
+async def preload_autocomplete():
+    await autocomplete_index.ensure_loaded()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "200"))
+
+class BatchLoader:
+    # Collects point lookups from every in-flight request for one short window and
+    # resolves them with a single load_many(keys) call returning {key: value}.
+    def __init__(self, name, load_many, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH_SIZE):
+        self.name = name
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = {}
+        self.timer = None
+        self.batches = 0
+        self.keys = 0
+        self.max_keys = 0
+
+    async def load(self, key):
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            if len(self.pending) >= self.max_batch:
+                self.flush()
+            elif self.timer is None:
+                self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await asyncio.shield(future)
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        self.keys += len(batch)
+        self.max_keys = max(self.max_keys, len(batch))
+        try:
+            values = await self.load_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Every caller may have gone away; mark the exception as retrieved.
+                    future.exception()
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "keys": self.keys,
+            "max_keys_per_batch": self.max_keys,
+            "avg_keys_per_batch": round(self.keys / self.batches, 2) if self.batches else 0,
+        }
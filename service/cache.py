@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+class Generations:
+    # Per-key write counters for "build, then keep the result only if nothing was
+    # written meanwhile". Counters come from one clock and only maxsize keys are
+    # remembered; a forgotten key reads as the newest counter ever forgotten, so
+    # forgetting can make a build look stale but never makes a stale one look fresh.
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._clock = 0
+        self._floor = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        return self._data.get(key, self._floor)
+
+    def bump(self, key):
+        self._clock += 1
+        self._data.pop(key, None)
+        self._data[key] = self._clock
+        while len(self._data) > self.maxsize:
+            _, evicted = self._data.popitem(last=False)
+            self._floor = max(self._floor, evicted)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,152 @@
+import bisect
+import os
+from datetime import date, datetime, timedelta, timezone
+from service.user_index import PerUserIndex
+from service.clients import get_supabase
+from service.response_cache import make_etag
+
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "1000"))
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "3600"))
+
+def parse_day(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+
+def make_event(content_id, oshi_id, oshi_name, title, start_date, end_date, count):
+    start = parse_day(start_date)
+    if start is None:
+        return None
+    end = max(parse_day(end_date) or start, start)
+    return {
+        "content_id": content_id,
+        "oshi_id": oshi_id,
+        "oshi_name": oshi_name,
+        "title": title,
+        "start_date": start_date,
+        "end_date": end_date,
+        "count": count,
+        "start": start,
+        "end": end,
+    }
+
+def public_event(event):
+    return {key: value for key, value in event.items() if key not in ("start", "end")}
+
+class UserCalendar:
+    # Events sorted by start day. An event overlapping [first, last] starts no
+    # earlier than first - longest span, so a range query is two bisects and a
+    # short scan instead of a pass over every event.
+    def __init__(self, events):
+        self.events = {}
+        self.starts = []
+        self.ordered = []
+        self.longest = timedelta(0)
+        self.ics = None
+        self.updated_at = datetime.now(timezone.utc)
+        self.replace(events, [])
+
+    def replace(self, added, removed_ids):
+        for content_id in removed_ids:
+            self.events.pop(content_id, None)
+        for event in added:
+            self.events[event["content_id"]] = event
+        self.ordered = sorted(self.events.values(), key=lambda event: (event["start"], event["end"], event["content_id"]))
+        self.starts = [event["start"] for event in self.ordered]
+        self.longest = max((event["end"] - event["start"] for event in self.ordered), default=timedelta(0))
+        self.ics = None
+        self.updated_at = datetime.now(timezone.utc)
+
+    def remove_oshi(self, oshi_ids):
+        self.replace([], [event["content_id"] for event in self.events.values() if event["oshi_id"] in oshi_ids])
+
+    def between(self, first, last):
+        low = bisect.bisect_left(self.starts, first - self.longest)
+        high = bisect.bisect_right(self.starts, last)
+        return [event for event in self.ordered[low:high] if event["end"] >= first]
+
+async def build_calendar(user_id):
+    supabase = await get_supabase()
+    oshi_response = await supabase.table("oshi").select("id", "oshi_name").eq("user_id", user_id).execute()
+    oshi_names = {str(oshi["id"]): oshi["oshi_name"] for oshi in oshi_response.data}
+    events = []
+    if oshi_names:
+        content_response = await supabase.table("content").select("id", "oshi_id").eq("type", "event").in_("oshi_id", list(oshi_names)).execute()
+        owners = {row["id"]: str(row["oshi_id"]) for row in content_response.data}
+        if owners:
+            event_response = await supabase.table("event_data").select("*").in_("id", list(owners)).execute()
+            for row in event_response.data:
+                oshi_id = owners.get(row["id"])
+                event = make_event(row["id"], oshi_id, oshi_names.get(oshi_id), row.get("title"), row.get("start_date"), row.get("end_date"), row.get("count"))
+                if event is not None:
+                    events.append(event)
+    return UserCalendar(events)
+
+class CalendarIndex(PerUserIndex):
+    def __init__(self, maxsize=CALENDAR_CACHE_SIZE, ttl=CALENDAR_CACHE_TTL):
+        super().__init__(build_calendar, maxsize, ttl)
+
+    def apply(self, user_id, events=None, removed_ids=()):
+        # events maps written block ids to their new event, or to None when the
+        # block no longer has a usable date; such blocks leave the calendar.
+        events = events or {}
+        added = [event for event in events.values() if event is not None]
+        removed_ids = [*removed_ids, *(content_id for content_id, event in events.items() if event is None)]
+        self.update(user_id, lambda calendar: calendar.replace(added, removed_ids))
+
+    def remove_oshi(self, user_id, oshi_ids):
+        oshi_ids = {str(oshi_id) for oshi_id in oshi_ids}
+        self.update(user_id, lambda calendar: calendar.remove_oshi(oshi_ids))
+
+calendar_index = CalendarIndex()
+
+def ics_escape(text):
+    return str(text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_fold(line):
+    # RFC 5545 lines are limited to 75 octets; continuation lines start with a space.
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > (75 if not parts else 74):
+            parts.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+def render_ics(calendar):
+    if calendar.ics is None:
+        stamp = calendar.updated_at.strftime("%Y%m%dT%H%M%SZ")
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//FanCloud//Oshi Events//JA",
+            "CALSCALE:GREGORIAN",
+            "X-WR-CALNAME:FanCloud",
+        ]
+        for event in calendar.ordered:
+            summary = f"{event['oshi_name']}: {event['title']}" if event["oshi_name"] else event["title"]
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:event-{event['content_id']}@fancloud",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART;VALUE=DATE:{event['start'].strftime('%Y%m%d')}",
+                f"DTEND;VALUE=DATE:{(event['end'] + timedelta(days=1)).strftime('%Y%m%d')}",
+                f"SUMMARY:{ics_escape(summary)}",
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        body = ("\r\n".join(ics_fold(line) for line in lines) + "\r\n").encode("utf-8")
+        calendar.ics = (body, make_etag(body))
+    return calendar.ics
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import httpx
+from dotenv import load_dotenv
+from service.metrics import instrument_supabase, instrument_http
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_USER_AGENT = "FanCloud/1.0 (https://fancloud.onrender.com)"
+
+_supabase = None
+_supabase_lock = asyncio.Lock()
+_http_client: httpx.AsyncClient = None
+
+async def get_supabase():
+    global _supabase
+    if _supabase is None:
+        async with _supabase_lock:
+            if _supabase is None:
+                # supabase pulls in gotrue, realtime and storage3; keep it off the import path.
+                from supabase import acreate_client
+                client = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+                instrument_supabase(client)
+                _supabase = client
+    return _supabase
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=20),
+            headers={"User-Agent": HTTP_USER_AGENT},
+            follow_redirects=True,
+        )
+        instrument_http(_http_client)
+    return _http_client
+
+async def close_clients():
+    global _supabase, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _supabase is not None:
+        await _supabase.postgrest.aclose()
+        _supabase = None
@@ -0,0 +1,139 @@
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from service.autocomplete import normalize
+from service.user_index import PerUserIndex
+
+SEARCH_INDEX_SIZE = int(os.getenv("SEARCH_INDEX_SIZE", "1000"))
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "3600"))
+SEARCHABLE_TYPES = ("text", "event", "sns")
+SEPARATORS = re.compile(r"[\s\W_]+")
+
+def block_text(block):
+    if block["type"] == "text":
+        return block.get("text") or ""
+    if block["type"] == "event":
+        return block.get("title") or ""
+    if block["type"] == "sns":
+        return " ".join(f"{link['name']} {link['url']}" for link in block.get("snsLinks") or [])
+    return ""
+
+def tokenize(text, unigrams=True):
+    # Character bigrams inside each run of word characters, so Japanese needs no
+    # word segmentation. Indexed text also carries every single character so a
+    # one-character query such as 「猫」 matches; longer queries only need bigrams.
+    grams = []
+    for run in SEPARATORS.split(normalize(text)):
+        if unigrams or len(run) == 1:
+            grams.extend(run)
+        grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+class UserSearchIndex:
+    def __init__(self, blocks):
+        self.documents = {}
+        self.postings = {}
+        for block in blocks:
+            self.add(block)
+
+    def add(self, block):
+        content_id = block["id"]
+        self.remove(content_id)
+        text = block_text(block)
+        terms = Counter(tokenize(text))
+        if not terms:
+            return
+        self.documents[content_id] = {
+            "content_id": content_id,
+            "oshi_id": str(block["oshi_id"]),
+            "oshi_name": block["oshi_name"],
+            "type": block["type"],
+            "order_index": block["order_index"],
+            "text": text,
+            "key": normalize(text),
+            "terms": terms,
+            "length": sum(terms.values()),
+        }
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[content_id] = count
+
+    def remove(self, content_id):
+        document = self.documents.pop(content_id, None)
+        if document is None:
+            return
+        for term in document["terms"]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(content_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def move(self, moves):
+        for content_id, order_index in moves.items():
+            if content_id in self.documents:
+                self.documents[content_id]["order_index"] = order_index
+
+    def remove_oshi(self, oshi_ids):
+        for content_id in [doc["content_id"] for doc in self.documents.values() if doc["oshi_id"] in oshi_ids]:
+            self.remove(content_id)
+
+    def search(self, query, limit):
+        terms = Counter(tokenize(query, unigrams=False))
+        if not terms:
+            return []
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        # Every query bigram must occur; intersecting from the rarest keeps the work
+        # proportional to the matches rather than to the size of the index.
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        if not candidates:
+            return []
+
+        key = normalize(query)
+        total = len(self.documents)
+        weights = [
+            (self.postings[term], query_count * math.log(1 + total / len(self.postings[term])))
+            for term, query_count in terms.items()
+        ]
+        hits = []
+        for content_id in candidates:
+            document = self.documents[content_id]
+            score = sum(posting[content_id] * weight for posting, weight in weights) / math.sqrt(document["length"])
+            if key and key in document["key"]:
+                score *= 2
+            hits.append((-score, document["oshi_name"] or "", document["order_index"], content_id))
+        return [
+            {
+                "content_id": content_id,
+                "oshi_name": self.documents[content_id]["oshi_name"],
+                "order_index": order_index,
+                "type": self.documents[content_id]["type"],
+                "text": self.documents[content_id]["text"],
+                "score": round(-score, 4),
+            }
+            for score, _, order_index, content_id in heapq.nsmallest(limit, hits)
+        ]
+
+class ContentSearchIndex(PerUserIndex):
+    def __init__(self, load_blocks, maxsize=SEARCH_INDEX_SIZE, ttl=SEARCH_INDEX_TTL):
+        async def build(user_id):
+            return UserSearchIndex(await load_blocks(user_id))
+        super().__init__(build, maxsize, ttl)
+
+    def apply(self, user_id, added=(), removed_ids=(), moves=None):
+        def change(index):
+            for content_id in removed_ids:
+                index.remove(content_id)
+            for block in added:
+                index.add(block)
+            index.move(moves or {})
+        self.update(user_id, change)
+
+    def remove_oshi(self, user_id, oshi_ids):
+        oshi_ids = {str(oshi_id) for oshi_id in oshi_ids}
+        self.update(user_id, lambda index: index.remove_oshi(oshi_ids))
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import random
+import time
+from fastapi import HTTPException
+
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+ENRICH_RATE = float(os.getenv("ENRICH_RATE", "5"))
+ENRICH_MAX_ATTEMPTS = int(os.getenv("ENRICH_MAX_ATTEMPTS", "4"))
+ENRICH_RETRY_DELAY = float(os.getenv("ENRICH_RETRY_DELAY", "1"))
+
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def is_permanent(error):
+    return isinstance(error, HTTPException) and error.status_code < 500
+
+class EnrichmentWorker:
+    # In-process job queue: a fixed pool of tasks pulls keys off the queue, spaces
+    # job starts by the rate limit and retries transient failures with backoff.
+    def __init__(self, enrich, on_failure, concurrency=ENRICH_CONCURRENCY, rate=ENRICH_RATE,
+                 max_attempts=ENRICH_MAX_ATTEMPTS, retry_delay=ENRICH_RETRY_DELAY):
+        self.enrich = enrich
+        self.on_failure = on_failure
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.queue = asyncio.Queue()
+        self.queued = set()
+        self.tasks = []
+        self.counters = {"enqueued": 0, "succeeded": 0, "retried": 0, "failed": 0}
+
+    def enqueue(self, key, *args):
+        if key in self.queued:
+            return False
+        self.queued.add(key)
+        self.queue.put_nowait((key, args))
+        self.counters["enqueued"] += 1
+        return True
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def join(self):
+        await self.queue.join()
+
+    async def _work(self):
+        while True:
+            key, args = await self.queue.get()
+            try:
+                await self._run(key, args)
+            finally:
+                self.queued.discard(key)
+                self.queue.task_done()
+
+    async def _run(self, key, args):
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.wait()
+            try:
+                await self.enrich(*args)
+                self.counters["succeeded"] += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+                if is_permanent(e) or attempt == self.max_attempts:
+                    print(f"Enrichment of {key} failed after {attempt} attempt(s): {e}")
+                    break
+                self.counters["retried"] += 1
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+        self.counters["failed"] += 1
+        try:
+            await self.on_failure(*args, error=error)
+        except Exception as e:
+            print(f"Failed to record enrichment failure for {key}: {e}")
+
+    def stats(self):
+        return {**self.counters, "queued": len(self.queued), "workers": len(self.tasks)}
+
+async def run_periodically(interval, fn):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await fn()
+        except Exception as e:
+            print(f"Periodic job {fn.__name__} failed: {e}")
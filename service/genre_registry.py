@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+import os
+import time
+from service.clients import get_supabase
+
+GENRE_REGISTRY_TTL = float(os.getenv("GENRE_REGISTRY_TTL", "600"))
+
+class GenreRegistry:
+    def __init__(self, ttl=GENRE_REGISTRY_TTL):
+        self.ttl = ttl
+        self.names = ()
+        self.etag = None
+        self.loaded_at = None
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self):
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    async def load(self):
+        supabase = await get_supabase()
+        response = await supabase.table('genres').select('genre_name').execute()
+        names = tuple(sorted({genre['genre_name'] for genre in response.data}))
+        self.names = names
+        self.etag = '"' + hashlib.sha256("\n".join(names).encode()).hexdigest()[:32] + '"'
+        self.loaded_at = time.monotonic()
+        return names
+
+    async def get_names(self):
+        if not self.is_fresh():
+            async with self._lock:
+                if not self.is_fresh():
+                    await self.load()
+        return self.names
+
+    async def invalid_genres(self, genres):
+        names = set(await self.get_names())
+        return [genre for genre in genres if genre not in names]
+
+    def invalidate(self):
+        self.loaded_at = None
+
+genre_registry = GenreRegistry()
+
+async def preload_genres():
+    try:
+        await genre_registry.load()
+    except Exception as e:
+        print(f"Failed to preload genres: {e}")
@@ -0,0 +1,69 @@
+import os
+from fastapi import HTTPException
+from service.cache import TTLCache
+from service.batching import BatchLoader
+from service.clients import get_supabase
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+user_ids = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+oshi_ids = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+async def load_user_ids(emails):
+    supabase = await get_supabase()
+    response = await supabase.table('users').select('id', 'email').in_('email', emails).execute()
+    return {user['email']: user['id'] for user in response.data}
+
+async def load_oshi_ids(keys):
+    # One in_ per column returns a superset of the requested pairs; keep the exact ones.
+    supabase = await get_supabase()
+    user_id_list = list({user_id for user_id, _ in keys})
+    oshi_names = list({oshi_name for _, oshi_name in keys})
+    response = await supabase.table('oshi').select('id', 'user_id', 'oshi_name').in_('user_id', user_id_list).in_('oshi_name', oshi_names).execute()
+    return {(str(oshi['user_id']), oshi['oshi_name']): oshi['id'] for oshi in response.data}
+
+user_loader = BatchLoader("users", load_user_ids)
+oshi_loader = BatchLoader("oshi", load_oshi_ids)
+
+async def resolve_user_id(email):
+    user_id = user_ids.get(email)
+    if user_id is not None:
+        return user_id
+
+    user_id = await user_loader.load(email)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user_ids.set(email, user_id)
+    return user_id
+
+async def resolve_oshi_id(user_id, oshi_name):
+    oshi_id = oshi_ids.get((user_id, oshi_name))
+    if oshi_id is not None:
+        return oshi_id
+
+    oshi_id = await oshi_loader.load((str(user_id), oshi_name))
+    if oshi_id is None:
+        raise HTTPException(status_code=404, detail="Oshi not found")
+
+    oshi_ids.set((user_id, oshi_name), oshi_id)
+    return oshi_id
+
+async def resolve_oshi(email, oshi_name):
+    user_id = await resolve_user_id(email)
+    return user_id, await resolve_oshi_id(user_id, oshi_name)
+
+def invalidate_user(email):
+    user_ids.pop(email)
+
+def invalidate_oshi(user_id, oshi_names):
+    for oshi_name in oshi_names:
+        oshi_ids.pop((user_id, oshi_name))
+
+def stats():
+    return {
+        "user_ids": user_ids.stats(),
+        "oshi_ids": oshi_ids.stats(),
+        "batches": {"users": user_loader.stats(), "oshi": oshi_loader.stats()},
+    }
@@ -0,0 +1,150 @@
+import contextvars
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self.series.items()):
+                pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, labels)]
+                for bound, count in zip(self.buckets + ("+Inf",), series["buckets"] + [series["count"]]):
+                    bucket_labels = ",".join(pairs + [f'le="{bound}"'])
+                    lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+                suffix = f'{{{",".join(pairs)}}}' if pairs else ""
+                lines.append(f"{self.name}_sum{suffix} {series['sum']}")
+                lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return "\n".join(lines)
+
+request_seconds = Histogram("fancloud_request_seconds", "Total request latency.", ("route", "method", "status"))
+supabase_call_seconds = Histogram("fancloud_supabase_call_seconds", "Supabase REST call latency.", ("table", "method"))
+supabase_calls_per_request = Histogram("fancloud_supabase_calls_per_request", "Supabase REST calls made by one request.", ("route",), COUNT_BUCKETS)
+http_call_seconds = Histogram("fancloud_http_call_seconds", "Outbound HTTP call latency on the shared client.", ("host",))
+http_calls_per_request = Histogram("fancloud_http_calls_per_request", "Outbound HTTP calls made by one request.", ("route",), COUNT_BUCKETS)
+parse_seconds = Histogram("fancloud_parse_seconds", "CPU time spent extracting Wikipedia articles.")
+
+HISTOGRAMS = (request_seconds, supabase_call_seconds, supabase_calls_per_request, http_call_seconds, http_calls_per_request, parse_seconds)
+
+class RequestStats:
+    def __init__(self):
+        self.supabase = {}
+        self.http = {}
+        self.parse_seconds = 0.0
+        self.parse_count = 0
+
+    def add(self, breakdown, key, seconds):
+        entry = breakdown.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def summary(self):
+        parts = [f"supabase.{table}={count}x/{seconds * 1000:.1f}ms" for table, (count, seconds) in self.supabase.items()]
+        parts += [f"http.{host}={count}x/{seconds * 1000:.1f}ms" for host, (count, seconds) in self.http.items()]
+        if self.parse_count:
+            parts.append(f"parse={self.parse_count}x/{self.parse_seconds * 1000:.1f}ms")
+        return " ".join(parts) or "no upstream calls"
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+def record_supabase_call(table, method, seconds):
+    supabase_call_seconds.observe(seconds, table, method)
+    stats = current_request.get()
+    if stats is not None:
+        stats.add(stats.supabase, table, seconds)
+
+def record_http_call(host, seconds):
+    http_call_seconds.observe(seconds, host)
+    stats = current_request.get()
+    if stats is not None:
+        stats.add(stats.http, host, seconds)
+
+def record_parse(seconds):
+    parse_seconds.observe(seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.parse_count += 1
+        stats.parse_seconds += seconds
+
+async def start_timer(request):
+    request.extensions["fancloud_started"] = time.perf_counter()
+
+def elapsed(response):
+    started = response.request.extensions.get("fancloud_started")
+    return time.perf_counter() - started if started is not None else 0.0
+
+async def on_supabase_response(response):
+    path = urlsplit(str(response.request.url)).path
+    table = path.rsplit("/rest/v1/", 1)[-1] or "unknown"
+    record_supabase_call(table, response.request.method, elapsed(response))
+
+async def on_http_response(response):
+    record_http_call(response.request.url.host, elapsed(response))
+
+def instrument_supabase(client):
+    hooks = client.postgrest.session.event_hooks
+    hooks["request"].append(start_timer)
+    hooks["response"].append(on_supabase_response)
+
+def instrument_http(client):
+    client.event_hooks["request"].append(start_timer)
+    client.event_hooks["response"].append(on_http_response)
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_seconds.observe(seconds, route, scope["method"], str(status["code"]))
+            supabase_calls_per_request.observe(sum(count for count, _ in stats.supabase.values()), route)
+            http_calls_per_request.observe(sum(count for count, _ in stats.http.values()), route)
+            if SLOW_REQUEST_MS and seconds * 1000 >= SLOW_REQUEST_MS:
+                print(f"Slow request {scope['method']} {route} {status['code']} {seconds * 1000:.1f}ms: {stats.summary()}")
+
+def render():
+    return "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+import os
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+STREAM_PAGE_SIZE = int(os.getenv("STREAM_PAGE_SIZE", "100"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def page_size(limit):
+    if limit is None:
+        return None
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(value, row_id):
+    # Keyset cursors carry the sort value and the row id; the id breaks ties so
+    # rows sharing a sort value are never skipped at a page boundary.
+    raw = json.dumps([value, row_id], ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, row_id
+
+def filter_value(value):
+    # PostgREST logic trees need values with reserved characters double-quoted.
+    value = str(value)
+    if any(char in value for char in ',.:()"\\ '):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return value
+
+def after_cursor(query, column, cursor):
+    # Rows strictly after the cursor in (column, id) order.
+    value, row_id = decode_cursor(cursor)
+    value = filter_value(value)
+    return query.or_(f"{column}.gt.{value},and({column}.eq.{value},id.gt.{filter_value(row_id)})")
+
+def wants_ndjson(accept):
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+def paged_rows(fetch_page, cursor, limit):
+    # fetch_page(cursor, size) returns (items, next_cursor); walk it until the limit or the end.
+    # The cursor is checked here, before streaming, so a bad one is still a 400 and not
+    # an empty 200 whose headers went out before the generator first ran.
+    if cursor is not None:
+        decode_cursor(cursor)
+
+    async def rows(cursor):
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+            items, cursor = await fetch_page(cursor, size)
+            for item in items:
+                yield item
+            if remaining is not None:
+                remaining -= size
+            if cursor is None:
+                break
+    return rows(cursor)
+
+def ndjson_response(rows):
+    async def lines():
+        async for row in rows:
+            yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
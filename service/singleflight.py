@@ -0,0 +1,45 @@
+import asyncio
+
+FOLD_BUCKETS = (0, 1, 5, 10, 50)
+FOLD_LABELS = ("0", "1-4", "5-9", "10-49", "50+")
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self.fetches = 0
+        self.folded = 0
+        self.max_folded = 0
+        self.folded_histogram = {bucket: 0 for bucket in FOLD_BUCKETS}
+        self._inflight = {}
+
+    async def do(self, key, fn):
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(fn())
+            flight = self._inflight[key] = {"task": task, "waiters": 0}
+            self.fetches += 1
+            task.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            flight["waiters"] += 1
+            self.folded += 1
+        return await asyncio.shield(flight["task"])
+
+    def _land(self, key, flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        waiters = flight["waiters"]
+        self.max_folded = max(self.max_folded, waiters)
+        bucket = max(b for b in FOLD_BUCKETS if waiters >= b)
+        self.folded_histogram[bucket] += 1
+        if not flight["task"].cancelled():
+            # Every caller may have gone away; mark the exception as retrieved.
+            flight["task"].exception()
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "folded": self.folded,
+            "in_flight": len(self._inflight),
+            "max_folded_per_fetch": self.max_folded,
+            "folded_per_fetch": dict(zip(FOLD_LABELS, self.folded_histogram.values())),
+        }
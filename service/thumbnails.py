@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, urljoin, urlsplit
+from service.cache import TTLCache
+from service.clients import SUPABASE_URL, get_http_client
+from service.singleflight import SingleFlight
+from service.wiki_extract import NO_IMAGE_URL
+
+THUMB_CACHE_DIR = os.getenv("THUMB_CACHE_DIR", "thumb_cache")
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+THUMB_SOURCE_TTL = float(os.getenv("THUMB_SOURCE_TTL", str(7 * 24 * 60 * 60)))
+THUMB_MAX_SOURCE_BYTES = int(os.getenv("THUMB_MAX_SOURCE_BYTES", str(10 * 1024 * 1024)))
+THUMB_MAX_PIXELS = int(os.getenv("THUMB_MAX_PIXELS", str(40_000_000)))
+THUMB_MAX_REDIRECTS = 3
+# Images are only fetched from Wikimedia and the app's own Supabase storage, so the
+# endpoint cannot be pointed at internal hosts or used to fill the disk cache.
+THUMB_ALLOWED_HOSTS = frozenset(
+    host.strip().lower()
+    for host in os.getenv("THUMB_ALLOWED_HOSTS", ",".join(filter(None, ("upload.wikimedia.org", urlsplit(SUPABASE_URL or "").hostname)))).split(",")
+    if host.strip()
+)
+THUMB_FAILURE_TTL = float(os.getenv("THUMB_FAILURE_TTL", "600"))
+THUMB_WORKERS = int(os.getenv("THUMB_WORKERS", str(min(2, os.cpu_count() or 1))))
+THUMB_SIZES = (96, 240, 480, 960)
+THUMB_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+FALLBACK_IMAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "No Image.png")
+# Values the Wikipedia extractor stores when an article has no usable picture.
+PLACEHOLDER_SOURCES = frozenset((None, "", "Image not found", NO_IMAGE_URL))
+
+class SourceUnavailable(Exception):
+    pass
+
+def snap_width(width):
+    if not width:
+        return THUMB_SIZES[1]
+    return next((size for size in THUMB_SIZES if size >= width), THUMB_SIZES[-1])
+
+def pick_format(fmt, accept):
+    if fmt in THUMB_FORMATS:
+        return fmt
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+def thumbnail_url(src, width=None):
+    if src in PLACEHOLDER_SOURCES:
+        return f"/image/thumb?w={snap_width(width)}"
+    return f"/image/thumb?src={quote(src, safe='')}&w={snap_width(width)}"
+
+def allowed_source(url):
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in THUMB_ALLOWED_HOSTS
+
+def render_variant(data, width, fmt):
+    # Runs in a worker process; Pillow is imported here so the API process never pays for it.
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = THUMB_MAX_PIXELS
+    with Image.open(io.BytesIO(data)) as image:
+        # open() only reads the header; refuse decompression bombs before decoding.
+        if image.width * image.height > THUMB_MAX_PIXELS:
+            raise ValueError(f"image has {image.width}x{image.height} pixels")
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, width * 4))
+        if fmt == "jpeg":
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            options = {"quality": 82, "optimize": True, "progressive": True}
+        else:
+            options = {"quality": 80, "method": 4}
+        output = io.BytesIO()
+        image.save(output, format=fmt.upper(), **options)
+        return output.getvalue()
+
+def cache_parent(name):
+    # Variants depend on their original, and an original on its origin record
+    # (the source URL it came from), so that it can be fetched again.
+    if name.startswith("src-"):
+        return "origin-" + name[4:]
+    if name[:64].isalnum() and name[64:65] == "-":
+        return "src-" + name[:64]
+    return None
+
+class DiskLRU:
+    # Files under one directory, evicted least recently used first once their total
+    # size passes max_bytes. Reads bump the mtime so the order survives restarts.
+    # A file is never evicted while files that depend on it (parent_of) remain.
+    def __init__(self, root, max_bytes, parent_of=cache_parent):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.parent_of = parent_of
+        self.size = 0
+        self.evictions = 0
+        self._entries = None
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            os.makedirs(self.root, exist_ok=True)
+            files = []
+            for name in os.listdir(self.root):
+                if name.startswith("."):
+                    continue
+                stat = os.stat(os.path.join(self.root, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+            self._entries = OrderedDict()
+            for _, name, size in sorted(files):
+                self._add(name, size)
+        return self._entries
+
+    def _add(self, name, size):
+        parent = self.parent_of(name)
+        if parent is not None:
+            self._children[parent] = self._children.get(parent, 0) + 1
+        self._entries[name] = size
+        self.size += size
+
+    def _forget(self, name):
+        if name not in self._entries:
+            return
+        self.size -= self._entries.pop(name)
+        parent = self.parent_of(name)
+        if parent is not None:
+            self._children[parent] -= 1
+            if not self._children[parent]:
+                del self._children[parent]
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def read(self, name):
+        with self._lock:
+            entries = self._load()
+            if name not in entries:
+                return None
+            entries.move_to_end(name)
+        try:
+            with open(self.path(name), "rb") as f:
+                data = f.read()
+            os.utime(self.path(name))
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(name)
+            return None
+
+    def age(self, name):
+        try:
+            return time.time() - os.stat(self.path(name)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def write(self, name, data):
+        temporary = self.path(f".{name}.{threading.get_ident()}.tmp")
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, self.path(name))
+        with self._lock:
+            self._load()
+            self._forget(name)
+            self._add(name, len(data))
+            while self.size > self.max_bytes:
+                evicted = next((entry for entry in self._entries if entry != name and not self._children.get(entry)), None)
+                if evicted is None:
+                    break
+                self._forget(evicted)
+                self.evictions += 1
+                try:
+                    os.remove(self.path(evicted))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            return {"files": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+class ThumbnailService:
+    def __init__(self, root=THUMB_CACHE_DIR, max_bytes=THUMB_CACHE_MAX_BYTES):
+        self.store = DiskLRU(root, max_bytes)
+        self.sources = SingleFlight("image_source")
+        self.variants = SingleFlight("image_variant")
+        self.failed = TTLCache(maxsize=10000, ttl=THUMB_FAILURE_TTL)
+        self.counters = {"variant_hits": 0, "rendered": 0, "source_fetches": 0, "fallbacks": 0}
+        self._pool = None
+
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=THUMB_WORKERS)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def source_digest(self, src):
+        # Source URLs map to the sha256 of their bytes; identical images fetched
+        # from different URLs share one original and one set of variants.
+        ref = "url-" + hashlib.sha256(src.encode()).hexdigest()
+        age = await asyncio.to_thread(self.store.age, ref)
+        if age is not None and age < THUMB_SOURCE_TTL:
+            digest = await asyncio.to_thread(self.store.read, ref)
+            if digest is not None and await asyncio.to_thread(self.store.age, f"src-{digest.decode()}") is not None:
+                return digest.decode()
+        return await self.sources.do(src, lambda: self.fetch_source(src, ref))
+
+    async def download(self, src):
+        # Redirects are followed by hand so every hop is checked against the allowlist.
+        url = src
+        for _ in range(THUMB_MAX_REDIRECTS + 1):
+            if not allowed_source(url):
+                raise SourceUnavailable("image host is not allowed")
+            async with get_http_client().stream("GET", url, follow_redirects=False) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["location"])
+                    continue
+                if response.status_code != 200:
+                    raise SourceUnavailable(f"image source returned {response.status_code}")
+                if int(response.headers.get("content-length") or 0) > THUMB_MAX_SOURCE_BYTES:
+                    raise SourceUnavailable("image source is too large")
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > THUMB_MAX_SOURCE_BYTES:
+                        raise SourceUnavailable("image source is too large")
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        raise SourceUnavailable("too many redirects")
+
+    async def fetch_source(self, src, ref):
+        self.counters["source_fetches"] += 1
+        data = await self.download(src)
+        digest = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._store_source, digest, data, src, ref)
+        return digest
+
+    def _store_source(self, digest, data, origin, ref=None):
+        # The origin goes first so it is always older than, and outlives, the original.
+        if self.store.read(f"origin-{digest}") is None:
+            self.store.write(f"origin-{digest}", origin.encode())
+        if self.store.read(f"src-{digest}") is None:
+            self.store.write(f"src-{digest}", data)
+        if ref is not None:
+            self.store.write(ref, digest.encode())
+
+    async def fallback_digest(self):
+        def load():
+            with open(FALLBACK_IMAGE_PATH, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            self._store_source(digest, data, "")
+            return digest
+        return await self.sources.do("fallback", lambda: asyncio.to_thread(load))
+
+    async def restore_original(self, digest):
+        # Variant URLs are immutable and cached for a year, so an evicted original is
+        # fetched again from its recorded origin rather than turning them into 404s.
+        origin = await asyncio.to_thread(self.store.read, f"origin-{digest}")
+        if origin is None:
+            raise SourceUnavailable("original and its origin were evicted")
+        if not origin:
+            await self.fallback_digest()
+        else:
+            src = origin.decode()
+            self.counters["source_fetches"] += 1
+            data = await self.download(src)
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise SourceUnavailable("image source has changed")
+            await asyncio.to_thread(self._store_source, digest, data, src)
+        return await asyncio.to_thread(self.store.read, f"src-{digest}")
+
+    async def resolve(self, src):
+        # Returns the digest of the image to render, falling back to "No Image.png".
+        if src not in PLACEHOLDER_SOURCES and self.failed.get(src) is None and allowed_source(src):
+            try:
+                return await self.source_digest(src)
+            except Exception as e:
+                self.failed.set(src, True)
+                print(f"Failed to fetch image {src}: {e}")
+        self.counters["fallbacks"] += 1
+        return await self.fallback_digest()
+
+    async def variant(self, digest, width, fmt):
+        name = f"{digest}-{width}.{fmt}"
+        data = await asyncio.to_thread(self.store.read, name)
+        if data is not None:
+            self.counters["variant_hits"] += 1
+            return data
+        return await self.variants.do(name, lambda: self.render(digest, width, fmt, name))
+
+    async def thumbnail(self, src, width, fmt):
+        # Makes sure the variant exists on disk and returns its immutable file name.
+        digest = await self.resolve(src)
+        try:
+            await self.variant(digest, width, fmt)
+        except Exception as e:
+            print(f"Failed to render image {src}: {e}")
+            self.failed.set(src, True)
+            self.counters["fallbacks"] += 1
+            digest = await self.fallback_digest()
+            await self.variant(digest, width, fmt)
+        return f"{digest}-{width}.{fmt}"
+
+    async def render(self, digest, width, fmt, name):
+        original = await asyncio.to_thread(self.store.read, f"src-{digest}")
+        if original is None:
+            original = await self.sources.do(f"restore-{digest}", lambda: self.restore_original(digest))
+        if original is None:
+            raise SourceUnavailable("original was evicted")
+        data = await asyncio.get_running_loop().run_in_executor(self.pool(), render_variant, original, width, fmt)
+        self.counters["rendered"] += 1
+        await asyncio.to_thread(self.store.write, name, data)
+        return data
+
+    def stats(self):
+        return {**self.counters, "disk": self.store.stats()}
+
+thumbnails = ThumbnailService()
@@ -0,0 +1,47 @@
+import asyncio
+from service.cache import TTLCache, Generations
+
+class PerUserIndex:
+    # Lazily built per-user in-memory index kept in sync by content writes. Writes
+    # bump a per-user generation; a build that overlapped a write is served to its
+    # callers once but not kept, since it may have missed that write.
+    def __init__(self, build, maxsize, ttl):
+        self.build = build
+        self.indexes = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = Generations()
+        self._building = {}
+
+    async def get(self, user_id):
+        index = self.indexes.get(user_id)
+        if index is not None:
+            return index
+        task = self._building.get(user_id)
+        if task is None:
+            task = self._building[user_id] = asyncio.ensure_future(self._build(user_id))
+            task.add_done_callback(lambda done: self._building.get(user_id) is done and self._building.pop(user_id))
+        return await asyncio.shield(task)
+
+    async def _build(self, user_id):
+        generation = self._generations.get(user_id)
+        try:
+            index = await self.build(user_id)
+        finally:
+            # Leave at once rather than in the done callback, so a get() right after a
+            # discarded build starts a new one instead of joining the finished task.
+            self._building.pop(user_id, None)
+        if generation == self._generations.get(user_id):
+            self.indexes.set(user_id, index)
+        return index
+
+    def update(self, user_id, change):
+        self._generations.bump(user_id)
+        index = self.indexes.get(user_id)
+        if index is not None:
+            change(index)
+
+    def invalidate(self, user_id):
+        self._generations.bump(user_id)
+        self.indexes.pop(user_id)
+
+    def stats(self):
+        return self.indexes.stats()
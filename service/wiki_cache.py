@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from service.cache import TTLCache
+
+WIKI_CACHE_PATH = os.getenv("WIKI_CACHE_PATH", "wiki_cache.sqlite3")
+WIKI_CACHE_SIZE = int(os.getenv("WIKI_CACHE_SIZE", "1024"))
+WIKI_CACHE_TTL = float(os.getenv("WIKI_CACHE_TTL", str(24 * 60 * 60)))
+
+class WikiCache:
+    def __init__(self, path=WIKI_CACHE_PATH, maxsize=WIKI_CACHE_SIZE, ttl=WIKI_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize)
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "revalidated": 0, "refetched": 0, "served_stale": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS wiki_cache ("
+                "title TEXT PRIMARY KEY, url TEXT NOT NULL, info TEXT NOT NULL, "
+                "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def _read(self, title):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT url, info, etag, last_modified, fetched_at FROM wiki_cache WHERE title = ?", (title,)
+            ).fetchone()
+
+    def _write(self, title, entry):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO wiki_cache (title, url, info, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (title, entry["url"], json.dumps(entry["info"], ensure_ascii=False), entry["etag"], entry["last_modified"], entry["fetched_at"]),
+            )
+            conn.commit()
+
+    async def get(self, title):
+        # Memory hits stay on the event loop; SQLite reads and writes run in a worker thread.
+        entry = self.memory.get(title)
+        if entry is not None:
+            self.counters["memory_hits"] += 1
+            return entry
+
+        row = await asyncio.to_thread(self._read, title)
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+
+        entry = {
+            "url": row[0],
+            "info": json.loads(row[1]),
+            "etag": row[2],
+            "last_modified": row[3],
+            "fetched_at": row[4],
+        }
+        self.memory.set(title, entry)
+        self.counters["disk_hits"] += 1
+        return entry
+
+    async def put(self, title, url, info, etag=None, last_modified=None):
+        entry = {"url": url, "info": info, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+        self.memory.set(title, entry)
+        await asyncio.to_thread(self._write, title, entry)
+        return entry
+
+    async def touch(self, title, entry):
+        return await self.put(title, entry["url"], entry["info"], entry["etag"], entry["last_modified"])
+
+    def _titles(self):
+        with self._lock:
+            return [row[0] for row in self._connect().execute("SELECT title FROM wiki_cache")]
+
+    async def titles(self):
+        # Every name a Wikipedia lookup has resolved, fresh or not.
+        return await asyncio.to_thread(self._titles)
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def stats(self):
+        return {**self.counters, "memory_size": len(self.memory), "memory_maxsize": self.memory.maxsize}
+
+wiki_cache = WikiCache()
@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+NO_IMAGE_URL = "https://www.shoshinsha-design.com/wp-content/uploads/2020/05/%E3%83%8E%E3%83%BC%E3%82%A4%E3%83%A1%E3%83%BC%E3%82%B7%E3%82%99-760x460.png"
+
+SNS_KEYS = ("youtube", "spotify", "soundcloud", "x", "instagram", "applemusic", "facebook")
+
+SNS_HOSTS = {
+    "youtube.com": "youtube",
+    "spotify.com": "spotify",
+    "soundcloud.com": "soundcloud",
+    "twitter.com": "x",
+    "x.com": "x",
+    "instagram.com": "instagram",
+    "music.apple.com": "applemusic",
+    "facebook.com": "facebook",
+}
+
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"))
+RAW_TEXT_TAGS = frozenset(("script", "style"))
+INFOBOX_LABELS = {"職業": "profession"}
+
+def classify_sns_host(href):
+    try:
+        host = urlsplit(href).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    # Walk up the domain so "open.spotify.com" and "www.youtube.com" hit the same entry.
+    while True:
+        key = SNS_HOSTS.get(host)
+        if key or "." not in host:
+            return key
+        host = host.split(".", 1)[1]
+
+class ArticleExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.infobox_depth = None
+        self.infobox_done = False
+        self.parser_output_depth = None
+        self.official_depth = None
+        self.official_site_url = None
+        self.image_src = None
+        self.label_depth = None
+        self.label_text = []
+        self.pending_label = None
+        self.pending_row_depth = None
+        self.value_depth = None
+        self.value_text = []
+        self.fields = {}
+        self.summary_depth = None
+        self.summary_text = None
+        self.raw_depth = None
+        self.sns_links = dict.fromkeys(SNS_KEYS)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        depth = len(self.stack)
+
+        if tag == "a":
+            href = attrs.get("href")
+            if href is not None:
+                if self.official_depth is not None and self.official_site_url is None:
+                    self.official_site_url = href
+                if "references" not in classes:
+                    key = classify_sns_host(href)
+                    if key:
+                        self.sns_links[key] = href
+        elif tag == "img":
+            if self.infobox_depth is not None and self.image_src is None and attrs.get("src"):
+                self.image_src = attrs["src"]
+            return
+
+        if tag in VOID_TAGS:
+            return
+
+        if self.raw_depth is None and tag in RAW_TEXT_TAGS:
+            self.raw_depth = depth
+        elif tag == "table" and "infobox" in classes and self.infobox_depth is None and not self.infobox_done:
+            self.infobox_depth = depth
+        elif tag == "div" and "mw-parser-output" in classes and self.parser_output_depth is None:
+            self.parser_output_depth = depth
+        elif tag == "p" and self.parser_output_depth is not None and self.summary_text is None and self.summary_depth is None:
+            self.summary_depth = depth
+            self.summary_text = []
+
+        if "official-website" in classes and self.official_depth is None and self.official_site_url is None:
+            self.official_depth = depth
+
+        if self.infobox_depth is not None:
+            if tag == "th" and self.label_depth is None:
+                self.label_depth = depth
+                self.label_text = []
+            elif tag == "td" and self.pending_label and self.value_depth is None and depth == self.pending_row_depth:
+                self.value_depth = depth
+                self.value_text = []
+
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or tag not in self.stack:
+            return
+        while self.stack:
+            open_tag = self.stack.pop()
+            self.leave(len(self.stack))
+            if open_tag == tag:
+                break
+
+    def leave(self, depth):
+        if depth == self.raw_depth:
+            self.raw_depth = None
+        if depth == self.label_depth:
+            self.label_depth = None
+            self.pending_label = INFOBOX_LABELS.get("".join(self.label_text))
+            self.pending_row_depth = depth
+        if depth == self.value_depth:
+            self.value_depth = None
+            self.fields.setdefault(self.pending_label, "".join(self.value_text))
+            self.pending_label = None
+        if self.pending_row_depth is not None and depth < self.pending_row_depth:
+            self.pending_label = None
+            self.pending_row_depth = None
+        if depth == self.summary_depth:
+            self.summary_depth = None
+        if depth == self.official_depth:
+            self.official_depth = None
+        if depth == self.infobox_depth:
+            self.infobox_depth = None
+            self.infobox_done = True
+        if depth == self.parser_output_depth:
+            self.parser_output_depth = None
+
+    def handle_data(self, data):
+        if self.raw_depth is not None:
+            return
+        text = data.strip()
+        if not text:
+            return
+        if self.label_depth is not None:
+            self.label_text.append(text)
+        if self.value_depth is not None:
+            self.value_text.append(text)
+        if self.summary_depth is not None:
+            self.summary_text.append(text)
+
+    def result(self):
+        image_url = None
+        if self.infobox_done or self.infobox_depth is not None:
+            if self.image_src:
+                image_url = f"https:{self.image_src}"
+                if "Flag_of" in image_url:
+                    image_url = NO_IMAGE_URL
+            else:
+                image_url = "Image not found"
+
+        profession = "Profession not found"
+        if "profession" in self.fields:
+            profession = ', '.join(self.fields["profession"].split('、'))
+
+        summary = "Summary not found"
+        if self.summary_text is not None:
+            summary = "".join(self.summary_text)
+
+        return {
+            "official_site_url": self.official_site_url or "Official site not found",
+            "sns_links": self.sns_links,
+            "image_url": image_url,
+            "profession": profession,
+            "summary": summary,
+        }
+
+def extract_wikipedia_info(html):
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    extractor = ArticleExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+_parse_pool = None
+
+def get_parse_pool():
+    # Created on first bulk import so single lookups and cold starts never fork workers.
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
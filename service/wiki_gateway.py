@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+import httpx
+from fastapi import HTTPException
+from service.clients import get_http_client
+
+WIKI_TIMEOUT = float(os.getenv("WIKI_TIMEOUT", "3"))
+WIKI_MAX_CONCURRENCY = int(os.getenv("WIKI_MAX_CONCURRENCY", "16"))
+WIKI_RATE = float(os.getenv("WIKI_RATE", "20"))
+WIKI_BURST = int(os.getenv("WIKI_BURST", "40"))
+WIKI_MAX_QUEUE_WAIT = float(os.getenv("WIKI_MAX_QUEUE_WAIT", "0.5"))
+WIKI_BREAKER_FAILURES = int(os.getenv("WIKI_BREAKER_FAILURES", "5"))
+WIKI_BREAKER_COOLDOWN = float(os.getenv("WIKI_BREAKER_COOLDOWN", "30"))
+
+class UpstreamUnavailable(HTTPException):
+    def __init__(self, detail, retry_after=None):
+        headers = {"Retry-After": str(max(1, int(retry_after)))} if retry_after else None
+        super().__init__(status_code=503, detail=detail, headers=headers)
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait):
+        # Takes a token now or books the next one if it arrives within max_wait; returns the wait, or None.
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+class CircuitBreaker:
+    # closed: calls flow. open: calls fail fast until the cooldown ends.
+    # half-open: one probe call decides whether to close again or reopen.
+    def __init__(self, failures=WIKI_BREAKER_FAILURES, cooldown=WIKI_BREAKER_COOLDOWN):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_after(self):
+        return self.cooldown - (time.monotonic() - self.opened_at) if self.opened_at is not None else None
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            if self.opened_at is None or self.probing:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+class WikipediaGateway:
+    def __init__(self, timeout=WIKI_TIMEOUT, max_concurrency=WIKI_MAX_CONCURRENCY, rate=WIKI_RATE,
+                 burst=WIKI_BURST, max_queue_wait=WIKI_MAX_QUEUE_WAIT):
+        self.timeout = timeout
+        self.max_queue_wait = max_queue_wait
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.in_flight = 0
+        self.counters = {"calls": 0, "failures": 0, "short_circuited": 0, "rate_limited": 0, "queue_timeouts": 0}
+
+    def healthy(self):
+        return self.breaker.state == "closed"
+
+    async def get(self, url, params=None):
+        return await self.request("GET", url, params)
+
+    async def request(self, method, url, params=None):
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise UpstreamUnavailable("Wikipedia is unavailable", self.breaker.retry_after())
+
+        try:
+            wait = self.bucket.reserve(self.max_queue_wait)
+            if wait is None:
+                self.counters["rate_limited"] += 1
+                raise UpstreamUnavailable("Wikipedia rate limit reached", 1)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.max_queue_wait)
+            except asyncio.TimeoutError:
+                self.counters["queue_timeouts"] += 1
+                raise UpstreamUnavailable("Too many Wikipedia requests in flight", 1)
+        except UpstreamUnavailable:
+            # Local back-pressure says nothing about the upstream; free a half-open probe slot.
+            self.breaker.probing = False
+            raise
+
+        self.counters["calls"] += 1
+        self.in_flight += 1
+        try:
+            response = await get_http_client().request(method, url, params=params, timeout=self.timeout)
+        except httpx.TransportError as e:
+            self._failed()
+            raise UpstreamUnavailable(f"Wikipedia request failed: {type(e).__name__}", self.breaker.retry_after()) from e
+        except asyncio.CancelledError:
+            self.breaker.probing = False
+            raise
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self._failed()
+            retry_after = response.headers.get("Retry-After", "")
+            raise UpstreamUnavailable(f"Wikipedia returned {response.status_code}", float(retry_after) if retry_after.isdigit() else None)
+        self.breaker.success()
+        return response
+
+    def _failed(self):
+        self.counters["failures"] += 1
+        self.breaker.failure()
+
+    def stats(self):
+        return {
+            **self.counters,
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "in_flight": self.in_flight,
+        }
+
+wikipedia = WikipediaGateway()
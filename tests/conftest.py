@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from postgrest import AsyncPostgrestClient
+from bench import fake_postgrest
+
+class FakeSupabase:
+    # The real PostgREST client talking to bench/fake_postgrest.py in-process.
+    def __init__(self):
+        self.postgrest = AsyncPostgrestClient("http://fake/rest/v1")
+        self.postgrest.session = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake_postgrest.app),
+            base_url="http://fake/rest/v1",
+            headers=self.postgrest.session.headers,
+        )
+        self.tables = fake_postgrest.tables
+        self.request_counts = fake_postgrest.request_counts
+
+    def table(self, name):
+        return self.postgrest.from_(name)
+
+    def rpc(self, name, params):
+        return self.postgrest.rpc(name, params)
+
+    async def get(self):
+        return self
+
+@pytest.fixture
+def fake_supabase():
+    # Empty tables for every test; patch a module's get_supabase with fake_supabase.get.
+    for name in fake_postgrest.tables:
+        fake_postgrest.tables[name] = []
+    return FakeSupabase()
@@ -0,0 +1,75 @@
+import asyncio
+from service.autocomplete import AutocompleteIndex, normalize
+from service.wiki_cache import WikiCache
+
+def test_normalize_folds_width_kana_case_and_separators():
+    assert normalize("ﾎｼﾉ ｹﾞﾝ") == normalize("ホシノゲン") == normalize("ほしのげん") == "ほしのげん"
+    assert normalize("Ｍｒｓ．ＧＲＥＥＮ ＡＰＰＬＥ") == normalize("mrs.green apple")
+    assert normalize("星野・源") == "星野源"
+
+def test_prefix_matches_rank_by_weight_then_length():
+    index = AutocompleteIndex()
+    index.add("星野源", weight=3)
+    index.add("星野みなみ", weight=5)
+    index.add("星街すいせい")
+    assert index.search("星野", 10) == ["星野みなみ", "星野源"]
+    assert index.search("星", 2) == ["星野みなみ", "星野源"]
+
+def test_fuzzy_match_through_bigrams():
+    index = AutocompleteIndex()
+    index.add("米津玄師")
+    assert index.search("津玄師", 4) == ["米津玄師"]
+
+def test_discard_removes_title_when_its_weight_runs_out():
+    index = AutocompleteIndex()
+    index.add("星野源")
+    index.add("星野源")
+    index.discard("星野源")
+    assert index.search("星野", 4) == ["星野源"]
+    index.discard("星野源")
+    assert index.search("星野", 4) == []
+    assert index.keys == [] and index.grams == {}
+
+def test_include_does_not_count_again():
+    index = AutocompleteIndex()
+    index.add("星野源")
+    index.include("星野源")
+    index.discard("星野源")
+    assert index.search("星野", 4) == []
+
+def test_load_seeds_only_from_wikipedia_backed_names(tmp_path, monkeypatch):
+    cache = WikiCache(path=str(tmp_path / "wiki.sqlite3"))
+    asyncio.run(cache.put("星野源", "https://ja.wikipedia.org/wiki/星野源", {}))
+    requested = []
+
+    class Query:
+        def __init__(self):
+            self.filters = []
+        def select(self, *columns):
+            return self
+        def eq(self, column, value):
+            self.filters.append((column, value))
+            return self
+        def order(self, column):
+            return self
+        def range(self, start, end):
+            return self
+        async def execute(self):
+            requested.append(self.filters)
+            class Response:
+                data = [{"oshi_name": "星野源"}]
+            return Response()
+
+    class Client:
+        def table(self, name):
+            return Query()
+
+    async def get_supabase():
+        return Client()
+
+    monkeypatch.setattr("service.autocomplete.wiki_cache", cache)
+    monkeypatch.setattr("service.autocomplete.get_supabase", get_supabase)
+    index = AutocompleteIndex()
+    asyncio.run(index.load())
+    assert requested == [[("enrich_status", "done")]]
+    assert index.weights == {"星野源": 2}
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import date
+from service.calendar import CalendarIndex, UserCalendar, make_event, parse_day, ics_fold, render_ics
+
+def event(content_id, start, end=None, title="ライブ"):
+    return make_event(content_id, "1", "星野源", title, start, end, None)
+
+def calendar_index_with(events):
+    index = CalendarIndex(maxsize=10, ttl=None)
+    async def build(user_id):
+        return UserCalendar(events)
+    index.build = build
+    return index
+
+def test_parse_day_accepts_dates_and_datetimes():
+    assert parse_day("2024-05-01") == date(2024, 5, 1)
+    assert parse_day("2024-05-01T19:00:00+09:00") == date(2024, 5, 1)
+    assert parse_day("soon") is None
+    assert parse_day(None) is None
+
+def test_between_finds_long_events_that_started_earlier():
+    calendar = UserCalendar([event(1, "2024-01-01", "2024-03-31"), event(2, "2024-02-10"), event(3, "2024-04-01")])
+    found = calendar.between(date(2024, 2, 1), date(2024, 2, 28))
+    assert [found_event["content_id"] for found_event in found] == [1, 2]
+
+def test_apply_removes_event_whose_date_stops_parsing():
+    async def scenario():
+        index = calendar_index_with([event(1, "2024-05-01")])
+        await index.get("u1")
+        index.apply("u1", events={1: event(1, "someday")})
+        return (await index.get("u1")).between(date(2024, 1, 1), date(2024, 12, 31))
+
+    assert asyncio.run(scenario()) == []
+
+def test_apply_moves_rewritten_event():
+    async def scenario():
+        index = calendar_index_with([event(1, "2024-05-01")])
+        await index.get("u1")
+        index.apply("u1", events={1: event(1, "2024-06-01")}, removed_ids=[])
+        return (await index.get("u1")).between(date(2024, 1, 1), date(2024, 12, 31))
+
+    assert [found["start_date"] for found in asyncio.run(scenario())] == ["2024-06-01"]
+
+def test_ics_lines_are_folded_to_75_octets():
+    line = "SUMMARY:" + "あ" * 60
+    folded = ics_fold(line).split("\r\n")
+    assert all(len(part.encode("utf-8")) <= 75 for part in folded)
+    assert "".join(part[1:] if i else part for i, part in enumerate(folded)) == line
+
+def test_render_ics_uses_exclusive_end_date_and_is_cached():
+    calendar = UserCalendar([event(1, "2024-05-01", "2024-05-02")])
+    body, etag = render_ics(calendar)
+    assert b"DTSTART;VALUE=DATE:20240501" in body
+    assert b"DTEND;VALUE=DATE:20240503" in body
+    assert render_ics(calendar) == (body, etag)
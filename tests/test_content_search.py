@@ -0,0 +1,31 @@
+from service.content_search import UserSearchIndex, tokenize
+
+def block(content_id, text, order_index=0):
+    return {"id": content_id, "oshi_id": 1, "oshi_name": "星野源", "type": "text", "text": text, "order_index": order_index}
+
+def test_tokenize_keeps_unigrams_for_documents_only():
+    assert tokenize("猫が") == ["猫", "が", "猫が"]
+    assert tokenize("猫が", unigrams=False) == ["猫が"]
+    assert tokenize("猫", unigrams=False) == ["猫"]
+
+def test_tokenize_folds_width_and_kana():
+    assert tokenize("ﾗｲﾌﾞ", unigrams=False) == tokenize("らいぶ", unigrams=False)
+
+def test_single_kanji_query_matches_inside_longer_text():
+    index = UserSearchIndex([block(1, "猫が好き"), block(2, "犬が好き")])
+    assert [hit["content_id"] for hit in index.search("猫", 10)] == [1]
+
+def test_every_query_bigram_must_match_and_phrase_ranks_first():
+    index = UserSearchIndex([block(1, "ライブ 東京ドーム", 0), block(2, "東京のライブハウス", 1), block(3, "大阪ライブ", 2)])
+    hits = index.search("東京ライブ", 10)
+    assert [hit["content_id"] for hit in hits] == []
+    hits = index.search("東京", 10)
+    assert {hit["content_id"] for hit in hits} == {1, 2}
+
+def test_remove_and_oshi_removal_drop_postings():
+    index = UserSearchIndex([block(1, "猫が好き"), {**block(2, "猫カフェ"), "oshi_id": 2}])
+    index.remove(1)
+    assert [hit["content_id"] for hit in index.search("猫", 10)] == [2]
+    index.remove_oshi({"2"})
+    assert index.search("猫", 10) == []
+    assert index.postings == {}
@@ -0,0 +1,26 @@
+import asyncio
+from handler import dashboard
+
+def test_first_blocks_takes_each_oshis_head_in_one_call(fake_supabase, monkeypatch):
+    # Gapped, out-of-order order_index values: "order_index < N" would not do.
+    fake_supabase.tables["content"] = [
+        {"id": 1, "oshi_id": "1", "type": "text", "order_index": 30},
+        {"id": 2, "oshi_id": "1", "type": "text", "order_index": 10},
+        {"id": 3, "oshi_id": "1", "type": "text", "order_index": 20},
+        {"id": 4, "oshi_id": "2", "type": "text", "order_index": 5},
+        {"id": 5, "oshi_id": "3", "type": "text", "order_index": 1},
+    ]
+    fake_supabase.tables["text_data"] = [{"id": n, "content": f"block {n}"} for n in range(1, 6)]
+    monkeypatch.setattr(dashboard, "get_supabase", fake_supabase.get)
+    monkeypatch.setattr("handler.content.get_supabase", fake_supabase.get)
+    counts = fake_supabase.request_counts
+    before = dict(counts)
+
+    heads = asyncio.run(dashboard.first_blocks([1, 2, 4], 2))
+    assert [block["id"] for block in heads["1"]["content"]] == [2, 3]
+    assert heads["1"]["content"][0]["content"] == "block 2"
+    assert heads["1"]["next_cursor"] is not None
+    assert [block["id"] for block in heads["2"]["content"]] == [4] and heads["2"]["next_cursor"] is None
+    assert heads["4"] == {"content": [], "next_cursor": None}
+    assert counts["rpc/dashboard_blocks"] - before.get("rpc/dashboard_blocks", 0) == 1
+    assert counts["content"] == before["content"]
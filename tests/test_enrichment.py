@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from handler import oshi
+from handler.oshi import ENRICH_MAX_REFRESHES, failure_info
+from service.enrichment import EnrichmentWorker, is_permanent
+
+def run_worker(enrich, max_attempts=3):
+    failures = []
+
+    async def on_failure(key, error=None):
+        failures.append((key, error))
+
+    async def scenario():
+        worker = EnrichmentWorker(enrich, on_failure, concurrency=2, rate=0, max_attempts=max_attempts, retry_delay=0.001)
+        worker.start()
+        assert worker.enqueue("a", "a")
+        assert not worker.enqueue("a", "a")
+        await worker.join()
+        await worker.stop()
+        return worker
+
+    return asyncio.run(scenario()), failures
+
+def test_transient_errors_are_retried_until_success():
+    calls = []
+
+    async def enrich(key):
+        calls.append(key)
+        if len(calls) < 3:
+            raise HTTPException(status_code=503)
+
+    worker, failures = run_worker(enrich)
+    assert len(calls) == 3
+    assert failures == []
+    assert worker.counters["retried"] == 2 and worker.counters["succeeded"] == 1
+
+def test_permanent_error_fails_at_once_and_reaches_on_failure():
+    calls = []
+
+    async def enrich(key):
+        calls.append(key)
+        raise HTTPException(status_code=404)
+
+    worker, failures = run_worker(enrich)
+    assert len(calls) == 1
+    assert failures[0][0] == "a" and is_permanent(failures[0][1])
+
+def test_failure_info_stops_retrying_misses_and_caps_attempts():
+    assert failure_info(1, HTTPException(status_code=404))["enrich_status"] == "not_found"
+    retry = failure_info(1, HTTPException(status_code=503))
+    assert retry["enrich_status"] == "failed" and retry["enrich_retry_at"] is not None
+    assert failure_info(ENRICH_MAX_REFRESHES, RuntimeError())["enrich_status"] == "gave_up"
+
+def test_refresher_skips_settled_rows_and_takes_the_oldest_first(fake_supabase, monkeypatch):
+    now = datetime.now(timezone.utc)
+    ago = lambda days: (now - timedelta(days=days)).isoformat()
+    fake_supabase.tables["oshi"] = [
+        {"id": 1, "oshi_name": "fresh", "enrich_status": "done", "enriched_at": ago(1), "enrich_attempts": 0},
+        {"id": 2, "oshi_name": "stale", "enrich_status": "done", "enriched_at": ago(30), "enrich_attempts": 0},
+        {"id": 3, "oshi_name": "older", "enrich_status": "done", "enriched_at": ago(60), "enrich_attempts": 0},
+        {"id": 4, "oshi_name": "missing", "enrich_status": "not_found", "enriched_at": ago(60), "enrich_attempts": 1},
+        {"id": 5, "oshi_name": "hopeless", "enrich_status": "gave_up", "enriched_at": ago(60), "enrich_attempts": ENRICH_MAX_REFRESHES},
+        {"id": 6, "oshi_name": "due", "enrich_status": "failed", "enrich_retry_at": ago(1), "enrich_attempts": 1},
+        {"id": 7, "oshi_name": "later", "enrich_status": "failed", "enrich_retry_at": ago(-1), "enrich_attempts": 1},
+        {"id": 8, "oshi_name": "spent", "enrich_status": "failed", "enrich_retry_at": None, "enrich_attempts": ENRICH_MAX_REFRESHES},
+        {"id": 9, "oshi_name": "lost", "enrich_status": "pending", "enrich_attempts": 0},
+    ]
+    queued = []
+    monkeypatch.setattr(oshi, "get_supabase", fake_supabase.get)
+    monkeypatch.setattr(oshi.enrichment, "enqueue", lambda key, *args: queued.append(key))
+    monkeypatch.setattr(oshi, "ENRICH_REFRESH_BATCH", 1)
+
+    asyncio.run(oshi.refresh_stale_oshi())
+    assert queued == [3, 9, 6]
@@ -0,0 +1,66 @@
+import asyncio
+from fastapi import HTTPException
+from handler import oshi
+from model.oshi import BulkOshiImportRequest
+
+INFO = {'official_site_url': None, 'sns_links': [], 'image_url': 'new.jpg', 'profession': None, 'summary': 'new'}
+
+def import_names(fake_supabase, monkeypatch, lookups):
+    async def fetch_wikipedia_infos(names):
+        return {name: {'fullurl': name} if lookups[name] != 'missing' else None for name in names}
+
+    async def import_wikipedia(name, page, semaphore):
+        if lookups[name] == 'error':
+            raise HTTPException(status_code=503)
+        return INFO
+
+    async def resolve_user_id(email):
+        return 'u1'
+
+    async def invalid_genres(genres):
+        return set()
+
+    added, included, queued = [], [], []
+    monkeypatch.setattr(oshi, 'get_supabase', fake_supabase.get)
+    monkeypatch.setattr(oshi, 'fetch_wikipedia_infos', fetch_wikipedia_infos)
+    monkeypatch.setattr(oshi, 'import_wikipedia', import_wikipedia)
+    monkeypatch.setattr(oshi, 'resolve_user_id', resolve_user_id)
+    monkeypatch.setattr(oshi.genre_registry, 'invalid_genres', invalid_genres)
+    monkeypatch.setattr(oshi, 'invalidate_oshi', lambda user_id, names: None)
+    monkeypatch.setattr(oshi.autocomplete_index, 'add', added.append)
+    monkeypatch.setattr(oshi.autocomplete_index, 'include', included.append)
+    monkeypatch.setattr(oshi.enrichment, 'enqueue', lambda key, *args: queued.append(args[-1]))
+    request = BulkOshiImportRequest(email='a@example.com', oshi=[{'oshi_name': name, 'genre': 'アイドル'} for name in lookups])
+    asyncio.run(oshi.import_oshi(request))
+    return added, included, queued
+
+def test_import_inserts_new_names_and_keeps_existing_rows(fake_supabase, monkeypatch):
+    fake_supabase.tables['oshi'] = [
+        {'id': 101, 'user_id': 'u1', 'oshi_name': 'old-hit', 'genres': '俳優', 'summary': 'old', 'enrich_status': 'done'},
+        {'id': 102, 'user_id': 'u1', 'oshi_name': 'old-miss', 'genres': '俳優', 'summary': 'old', 'enrich_status': 'done'},
+        {'id': 103, 'user_id': 'u1', 'oshi_name': 'old-error', 'genres': '俳優', 'summary': 'old', 'enrich_status': 'pending'},
+    ]
+    added, included, queued = import_names(fake_supabase, monkeypatch, {
+        'old-hit': 'found', 'old-miss': 'missing', 'old-error': 'error',
+        'new-hit': 'found', 'new-miss': 'missing', 'new-error': 'error',
+    })
+
+    rows = {row['oshi_name']: row for row in fake_supabase.tables['oshi']}
+    assert len(rows) == len(fake_supabase.tables['oshi']) == 6
+    assert all(row['genres'] == 'アイドル' for row in rows.values())
+    assert rows['old-hit']['summary'] == 'new' and rows['old-hit']['id'] == 101
+    assert rows['old-miss']['summary'] == 'old' and rows['old-miss']['enrich_status'] == 'done'
+    assert rows['new-miss']['enrich_status'] == 'not_found'
+    assert added == ['new-hit'] and included == ['old-hit']
+    assert sorted(queued) == ['new-error', 'old-error']
+
+def test_fake_rejects_an_on_conflict_without_a_unique_key(fake_supabase):
+    async def upsert():
+        await fake_supabase.table('oshi').upsert({'user_id': 'u1', 'oshi_name': 'a'}, on_conflict='oshi_name').execute()
+
+    try:
+        asyncio.run(upsert())
+    except Exception as error:
+        assert '42P10' in str(error)
+    else:
+        raise AssertionError('upsert on a non-unique column should fail')
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from handler import content
+from bench.fake_postgrest import logical, ordered
+from service.pagination import after_cursor, decode_cursor, encode_cursor, filter_value, page_size, paged_rows
+
+class FakeQuery:
+    # Just enough of the PostgREST query builder to apply an or_() filter locally.
+    def __init__(self):
+        self.filters = []
+
+    def or_(self, filters):
+        self.filters.append(logical("or", f"({filters})"))
+        return self
+
+def keyset_page(rows, column, cursor, limit):
+    candidates = ordered(rows, f"{column},id")
+    if cursor is not None:
+        for test in after_cursor(FakeQuery(), column, cursor).filters:
+            candidates = [row for row in candidates if test(row)]
+    page = candidates[:limit]
+    next_cursor = encode_cursor(page[-1][column], page[-1]["id"]) if len(page) == limit else None
+    return page, next_cursor
+
+def walk(rows, column, limit):
+    seen, cursor = [], None
+    while True:
+        page, cursor = keyset_page(rows, column, cursor, limit)
+        seen.extend(row["id"] for row in page)
+        if cursor is None:
+            return seen
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("星野 源, (歌手)", 42)
+    assert decode_cursor(cursor) == ("星野 源, (歌手)", 42)
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(1, 2)[:-2], "MTIz"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_filter_value_quotes_reserved_characters():
+    assert filter_value("abc") == "abc"
+    assert filter_value("a,b") == '"a,b"'
+    assert filter_value('say "hi"') == '"say \\"hi\\""'
+
+def test_rows_sharing_a_sort_value_are_not_skipped_between_pages():
+    rows = [{"id": i, "order_index": i // 3} for i in range(1, 11)]
+    assert walk(rows, "order_index", 2) == list(range(1, 11))
+
+def test_names_with_reserved_characters_page_cleanly():
+    names = ["a,b", "a,b", "a(c)", 'x"y', "x.y", "z"]
+    rows = [{"id": i, "oshi_name": name} for i, name in enumerate(names, 1)]
+    assert sorted(walk(rows, "oshi_name", 1)) == list(range(1, 7))
+
+def test_page_size_rejects_non_positive_limits():
+    assert page_size(None) is None
+    assert page_size(10_000) == 500
+    with pytest.raises(HTTPException):
+        page_size(0)
+
+def test_paged_rows_stops_at_limit():
+    async def fetch_page(cursor, size):
+        start = cursor or 0
+        return list(range(start, start + size)), start + size
+
+    async def collect():
+        return [row async for row in paged_rows(fetch_page, None, 250)]
+
+    assert asyncio.run(collect()) == list(range(250))
+
+def test_bad_cursor_is_a_400_before_ndjson_streaming_starts(monkeypatch):
+    async def resolve_oshi(email, oshi_name):
+        return "user", 1
+
+    async def fetch_content_page(oshi_id, cursor, limit):
+        pytest.fail("must not query with an invalid cursor")
+
+    monkeypatch.setattr(content, "resolve_oshi", resolve_oshi)
+    monkeypatch.setattr(content, "fetch_content_page", fetch_content_page)
+    app = FastAPI()
+    app.include_router(content.router, prefix="/content")
+    response = TestClient(app).post(
+        "/content/fetch-content",
+        json={"email": "a@example.com", "oshi_name": "推し", "cursor": "not base64!"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 400
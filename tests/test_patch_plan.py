@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from handler import content
+from handler.content import plan_patch
+from model.content import ContentOperation, TextContent
+
+EXISTING = {
+    "1": {"id": 1, "type": "text", "order_index": 0},
+    "2": {"id": 2, "type": "text", "order_index": 1},
+}
+
+def text(order_index, value="A"):
+    return TextContent(type="text", text=value, fontSize=12, alignment="left", order_index=order_index)
+
+def test_plan_groups_operations_and_detects_moves():
+    inserts, updates, deletes, moves = plan_patch([
+        ContentOperation(op="insert", content=text(2)),
+        ContentOperation(op="update", id=1, content=text(3, "B")),
+        ContentOperation(op="move", id=2, order_index=0),
+    ], EXISTING)
+    assert len(inserts) == 1
+    assert set(updates) == {"1"}
+    assert deletes == set()
+    assert moves == {"1": 3, "2": 0}
+
+def test_delete_cancels_earlier_update_and_move():
+    _, updates, deletes, moves = plan_patch([
+        ContentOperation(op="update", id=1, content=text(3)),
+        ContentOperation(op="delete", id=1),
+    ], EXISTING)
+    assert updates == {} and moves == {} and deletes == {"1"}
+
+@pytest.mark.parametrize("operation, status", [
+    (ContentOperation(op="rename", id=1), 400),
+    (ContentOperation(op="update", id=9, content=text(0)), 404),
+    (ContentOperation(op="move", id=1), 400),
+    (ContentOperation(op="insert"), 400),
+])
+def test_invalid_operations_are_rejected_before_any_write(operation, status):
+    with pytest.raises(HTTPException) as error:
+        plan_patch([operation], EXISTING)
+    assert error.value.status_code == status
+
+class FakeTable:
+    # Applies the few write calls restore_blocks makes to an in-memory table.
+    def __init__(self, rows):
+        self.rows = rows
+
+    def delete(self):
+        return self
+
+    def in_(self, column, values):
+        self.rows[:] = [row for row in self.rows if row[column] not in values]
+        return self
+
+    def insert(self, rows):
+        self.rows.extend(rows)
+        return self
+
+    def upsert(self, rows, on_conflict):
+        kept = [row for row in self.rows if row[on_conflict] not in {new[on_conflict] for new in rows}]
+        self.rows[:] = kept + rows
+        return self
+
+    async def execute(self):
+        return self
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = tables
+
+    def table(self, name):
+        return FakeTable(self.tables.setdefault(name, []))
+
+def test_restore_removes_links_added_to_a_block_that_had_none(monkeypatch):
+    block = {"id": 7, "type": "sns", "order_index": 0}
+    supabase = FakeSupabase(content=[dict(block)], sns_data=[{"id": 7, "name": "x", "url": "https://x.com/new"}])
+
+    async def get_supabase():
+        return supabase
+
+    monkeypatch.setattr(content, "get_supabase", get_supabase)
+    asyncio.run(content.restore_blocks([block], [block], {"sns_data": []}))
+    assert supabase.tables["sns_data"] == []
+    assert supabase.tables["content"] == [block]
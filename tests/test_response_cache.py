@@ -0,0 +1,35 @@
+from service.cache import Generations
+from service.response_cache import ResponseCache, etag_matches
+
+def test_put_is_dropped_after_invalidate():
+    cache = ResponseCache()
+    generation = cache.generation("oshi-1")
+    cache.invalidate("oshi-1")
+    cache.put("oshi-1", b"stale", generation)
+    assert cache.get("oshi-1") is None
+
+    generation = cache.generation("oshi-1")
+    etag = cache.put("oshi-1", b"fresh", generation)
+    assert cache.get("oshi-1") == (b"fresh", etag)
+
+def test_evicts_oldest_body_over_max_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", b"123456", cache.generation("a"))
+    cache.put("b", b"123456", cache.generation("b"))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.evictions == 1
+
+def test_generations_stay_bounded_and_never_look_fresh():
+    generations = Generations(maxsize=3)
+    before = generations.get("key-0")
+    for i in range(100):
+        generations.bump(f"key-{i}")
+    assert len(generations) == 3
+    # key-0 was bumped and then forgotten; it must still differ from the earlier read.
+    assert generations.get("key-0") != before
+
+def test_etag_matches_lists_and_wildcard():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
@@ -0,0 +1,132 @@
+import asyncio
+import io
+import httpx
+import pytest
+from PIL import Image
+from service import thumbnails
+from service.thumbnails import (
+    DiskLRU, SourceUnavailable, ThumbnailService, allowed_source, pick_format, render_variant, snap_width, thumbnail_url,
+)
+
+def png(width, height):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 50, 50)).save(output, format="PNG")
+    return output.getvalue()
+
+def test_snap_width_rounds_up_to_a_standard_size():
+    assert snap_width(None) == 240
+    assert snap_width(1) == 96
+    assert snap_width(96) == 96
+    assert snap_width(200) == 240
+    assert snap_width(5000) == 960
+
+def test_pick_format_prefers_explicit_then_accept():
+    assert pick_format("jpeg", "image/webp") == "jpeg"
+    assert pick_format(None, "image/avif,image/webp,*/*") == "webp"
+    assert pick_format(None, None) == "jpeg"
+
+def test_thumbnail_url_for_placeholders_has_no_source():
+    assert thumbnail_url("Image not found", 100) == "/image/thumb?w=240"
+    assert thumbnail_url("https://upload.wikimedia.org/a b.jpg") == "/image/thumb?src=https%3A%2F%2Fupload.wikimedia.org%2Fa%20b.jpg&w=240"
+
+def test_only_allowlisted_hosts_are_sources():
+    assert allowed_source("https://upload.wikimedia.org/wikipedia/commons/a.jpg")
+    assert not allowed_source("http://169.254.169.254/latest/meta-data/")
+    assert not allowed_source("http://localhost:8000/admin")
+    assert not allowed_source("file:///etc/passwd")
+    assert not allowed_source("https://upload.wikimedia.org.evil.example/a.jpg")
+
+def test_render_variant_resizes_and_encodes():
+    for fmt, kind in (("webp", "WEBP"), ("jpeg", "JPEG")):
+        with Image.open(io.BytesIO(render_variant(png(800, 400), 240, fmt))) as image:
+            assert image.format == kind and image.size == (240, 120)
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+def test_render_variant_refuses_huge_images(monkeypatch):
+    monkeypatch.setattr(thumbnails, "THUMB_MAX_PIXELS", 10_000)
+    with pytest.raises((ValueError, Image.DecompressionBombError)):
+        render_variant(png(200, 200), 96, "jpeg")
+    with pytest.raises(ValueError):
+        render_variant(png(150, 100), 96, "jpeg")
+
+def serve(monkeypatch, handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    monkeypatch.setattr(thumbnails, "get_http_client", lambda: client)
+
+def test_redirects_are_checked_against_the_allowlist(monkeypatch, tmp_path):
+    def handler(request):
+        if request.url.path == "/safe.png":
+            return httpx.Response(200, content=png(10, 10))
+        if request.url.path == "/to-safe.png":
+            return httpx.Response(302, headers={"location": "/safe.png"})
+        return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+
+    serve(monkeypatch, handler)
+    service = ThumbnailService(root=str(tmp_path))
+    assert asyncio.run(service.download("https://upload.wikimedia.org/to-safe.png")) == png(10, 10)
+    with pytest.raises(SourceUnavailable):
+        asyncio.run(service.download("https://upload.wikimedia.org/to-metadata.png"))
+
+def test_oversized_sources_are_rejected(monkeypatch, tmp_path):
+    monkeypatch.setattr(thumbnails, "THUMB_MAX_SOURCE_BYTES", 100)
+    serve(monkeypatch, lambda request: httpx.Response(200, content=b"x" * 1000))
+    with pytest.raises(SourceUnavailable):
+        asyncio.run(ThumbnailService(root=str(tmp_path)).download("https://upload.wikimedia.org/big.png"))
+
+def test_disallowed_source_renders_the_fallback(monkeypatch, tmp_path):
+    serve(monkeypatch, lambda request: pytest.fail("must not fetch"))
+    service = ThumbnailService(root=str(tmp_path))
+
+    async def scenario():
+        name = await service.thumbnail("http://10.0.0.1/secret.png", 96, "jpeg")
+        await asyncio.sleep(0)
+        return name, await service.fallback_digest()
+
+    try:
+        name, fallback = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    assert name == f"{fallback}-96.jpeg"
+    assert service.counters["fallbacks"] == 1
+
+def test_disk_lru_evicts_least_recently_used_first(tmp_path):
+    store = DiskLRU(str(tmp_path), max_bytes=30, parent_of=lambda name: None)
+    store.write("a", b"x" * 10)
+    store.write("b", b"x" * 10)
+    store.write("c", b"x" * 10)
+    assert store.read("a") == b"x" * 10
+    store.write("d", b"x" * 10)
+    assert store.read("b") is None
+    assert store.stats() == {"files": 3, "bytes": 30, "max_bytes": 30, "evictions": 1}
+    assert DiskLRU(str(tmp_path), max_bytes=30).stats()["bytes"] == 30
+
+def test_disk_lru_keeps_originals_until_their_variants_are_evicted(tmp_path):
+    digest = "0" * 64
+    store = DiskLRU(str(tmp_path), max_bytes=30)
+    store.write(f"origin-{digest}", b"x" * 10)
+    store.write(f"src-{digest}", b"x" * 10)
+    store.write(f"{digest}-96.jpeg", b"x" * 10)
+    store.write("other", b"x" * 10)
+    assert store.read(f"src-{digest}") is not None and store.read(f"origin-{digest}") is not None
+    assert store.read(f"{digest}-96.jpeg") is None
+    store.write("another", b"x" * 20)
+    assert store.read(f"src-{digest}") is None and store.read(f"origin-{digest}") is not None
+
+def test_evicted_originals_are_fetched_again(monkeypatch, tmp_path):
+    serve(monkeypatch, lambda request: httpx.Response(200, content=png(300, 300)))
+    service = ThumbnailService(root=str(tmp_path))
+    src = "https://upload.wikimedia.org/a.png"
+
+    async def scenario():
+        digest = await service.resolve(src)
+        service.store._forget(f"src-{digest}")
+        (tmp_path / f"src-{digest}").unlink()
+        return await service.variant(digest, 96, "jpeg")
+
+    try:
+        data = asyncio.run(scenario())
+    finally:
+        service.shutdown()
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (96, 96)
+    assert service.counters["source_fetches"] == 2
@@ -0,0 +1,38 @@
+import asyncio
+from service.user_index import PerUserIndex
+
+def test_build_overlapping_a_write_is_not_kept():
+    builds = []
+
+    async def build(user_id):
+        builds.append(user_id)
+        await asyncio.sleep(0.01)
+        return {"built": len(builds)}
+
+    async def scenario():
+        index = PerUserIndex(build, maxsize=10, ttl=None)
+        first = asyncio.ensure_future(index.get("u1"))
+        await asyncio.sleep(0.001)
+        index.update("u1", lambda value: None)
+        served = await first
+        return served, await index.get("u1")
+
+    served, rebuilt = asyncio.run(scenario())
+    assert served == {"built": 1}
+    assert rebuilt == {"built": 2}
+
+def test_update_patches_cached_index_and_invalidate_drops_it():
+    async def build(user_id):
+        return {"events": []}
+
+    async def scenario():
+        index = PerUserIndex(build, maxsize=10, ttl=None)
+        value = await index.get("u1")
+        index.update("u1", lambda value: value["events"].append("e1"))
+        patched = await index.get("u1")
+        index.invalidate("u1")
+        return value, patched, index.indexes.get("u1")
+
+    value, patched, after = asyncio.run(scenario())
+    assert patched is value and patched["events"] == ["e1"]
+    assert after is None
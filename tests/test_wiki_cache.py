@@ -0,0 +1,24 @@
+import asyncio
+from service.wiki_cache import WikiCache
+
+def test_put_then_get_reads_back_from_disk(tmp_path):
+    path = str(tmp_path / "wiki.sqlite3")
+
+    async def scenario():
+        await WikiCache(path=path).put("星野源", "https://ja.wikipedia.org/wiki/星野源", {"summary": "歌手"}, etag="42")
+        cache = WikiCache(path=path)
+        entry = await cache.get("星野源")
+        again = await cache.get("星野源")
+        return cache, entry, again
+
+    cache, entry, again = asyncio.run(scenario())
+    assert entry["info"] == {"summary": "歌手"}
+    assert entry["etag"] == "42"
+    assert again is entry
+    assert cache.counters["disk_hits"] == 1
+    assert cache.counters["memory_hits"] == 1
+
+def test_miss_is_counted(tmp_path):
+    cache = WikiCache(path=str(tmp_path / "wiki.sqlite3"))
+    assert asyncio.run(cache.get("missing")) is None
+    assert cache.counters["misses"] == 1
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+import handler.oshi as oshi
+from service import wiki_gateway
+from service.wiki_cache import WikiCache
+from service.wiki_gateway import CircuitBreaker, TokenBucket
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wiki_gateway.time, "monotonic", clock)
+    return clock
+
+def test_token_bucket_spends_burst_then_books_ahead(clock):
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve(0) == 0
+    assert bucket.reserve(0) == 0
+    assert bucket.reserve(0) is None
+    assert bucket.reserve(0.5) == pytest.approx(0.1)
+    assert bucket.reserve(0.5) == pytest.approx(0.2)
+    clock.now += 1
+    assert bucket.reserve(0) == 0
+
+def test_breaker_opens_after_threshold_and_probes_once(clock):
+    breaker = CircuitBreaker(failures=2, cooldown=30)
+    breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(30)
+
+    clock.now += 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and breaker.trips == 2
+
+    clock.now += 31
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+def stale_cache(tmp_path, monkeypatch, error):
+    cache = WikiCache(path=str(tmp_path / "wiki.sqlite3"), ttl=0)
+
+    async def refresh(oshi_name, entry):
+        raise error
+
+    monkeypatch.setattr(oshi, "wiki_cache", cache)
+    monkeypatch.setattr(oshi, "refresh_wikipedia", refresh)
+    return cache
+
+def resolve_stale(cache, allow_stale=True):
+    async def scenario():
+        await cache.put("星野源", "https://ja.wikipedia.org/wiki/星野源", {"summary": "歌手"}, etag="1")
+        return await oshi.resolve_wikipedia("星野源", allow_stale)
+
+    return asyncio.run(scenario())
+
+@pytest.mark.parametrize("error", [HTTPException(status_code=503), ValueError("bad json")])
+def test_stale_entry_is_served_when_refresh_fails(tmp_path, monkeypatch, error):
+    cache = stale_cache(tmp_path, monkeypatch, error)
+    assert resolve_stale(cache) == ("https://ja.wikipedia.org/wiki/星野源", {"summary": "歌手"})
+    assert cache.counters["served_stale"] == 1
+
+def test_deleted_page_is_not_served_stale(tmp_path, monkeypatch):
+    cache = stale_cache(tmp_path, monkeypatch, HTTPException(status_code=404, detail="Wikipedia page not found"))
+    with pytest.raises(HTTPException) as raised:
+        resolve_stale(cache)
+    assert raised.value.status_code == 404 and cache.counters["served_stale"] == 0
+
+def test_refresher_gets_the_refresh_error_instead_of_stale_info(tmp_path, monkeypatch):
+    cache = stale_cache(tmp_path, monkeypatch, HTTPException(status_code=503))
+    with pytest.raises(HTTPException):
+        resolve_stale(cache, allow_stale=False)
+    assert cache.counters["served_stale"] == 0